@@ -0,0 +1,141 @@
+import numpy
+from scipy import sparse
+
+from bookrec.operations import (
+    artefactOperations,
+    featureStoreOperations,
+    similarityOperations
+)
+from core.models import (
+    Book,
+    UserActivityLog
+)
+
+ALSO_VIEWED_ARTEFACT = 'also-viewed'
+NUMBER_OF_NEIGHBOURS = 12
+SESSION_GAP = 60 * 30
+MAXIMUM_SESSION_BOOKS = 50
+MINIMUM_CO_VIEWS = 2
+READ_CHUNK_SIZE = 5000
+SESSIONS_PER_CHUNK = 10000
+
+
+def viewSessions(since=None):
+    """
+    Streams each user's VIEW_BOOK events in time order and yields the distinct book ids of every session,
+    a session ending when the user has not viewed a book for SESSION_GAP seconds.
+    """
+    bookIdsByIsbn13 = dict(Book.objects.values_list('isbn13', 'id').iterator(chunk_size=READ_CHUNK_SIZE))
+    views = UserActivityLog.objects.filter(action=UserActivityLog.Action.VIEW_BOOK)
+    if since is not None:
+        views = views.filter(timeStamp__gte=since)
+
+    sessionUserId, lastViewedAt, session = None, None, {}
+    for userId, timeStamp, data in views.order_by('user_id', 'timeStamp').values_list(
+        'user_id', 'timeStamp', 'data'
+    ).iterator(chunk_size=READ_CHUNK_SIZE):
+        if userId != sessionUserId or (timeStamp - lastViewedAt).total_seconds() > SESSION_GAP:
+            if len(session) > 1:
+                yield list(session)
+            sessionUserId, session = userId, {}
+        lastViewedAt = timeStamp
+
+        bookId = bookIdsByIsbn13.get((data or {}).get('book-isbn13'))
+        # Very long sessions are usually crawlers and would add a quadratic number of pairs.
+        if bookId is not None and len(session) < MAXIMUM_SESSION_BOOKS:
+            session[bookId] = None
+
+    if len(session) > 1:
+        yield list(session)
+
+
+def coViewCounts(sessions, numberOfBooks):
+    """
+    Sparse books x books matrix of how many sessions viewed both books, accumulated SESSIONS_PER_CHUNK
+    sessions at a time as a sessions x books incidence product. sessions hold column numbers.
+    """
+    counts = sparse.csr_matrix((numberOfBooks, numberOfBooks), dtype=numpy.float32)
+    rows, columns = [], []
+
+    def accumulate():
+        incidence = sparse.csr_matrix(
+            (numpy.ones(len(columns), dtype=numpy.float32), (rows, columns)),
+            shape=(rows[-1] + 1 if rows else 0, numberOfBooks)
+        )
+        return counts + (incidence.T @ incidence).tocsr()
+
+    for session in sessions:
+        sessionRow = rows[-1] + 1 if rows else 0
+        rows.extend([sessionRow] * len(session))
+        columns.extend(session)
+        if sessionRow + 1 >= SESSIONS_PER_CHUNK:
+            counts = accumulate()
+            rows, columns = [], []
+    if rows:
+        counts = accumulate()
+
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts
+
+
+def topCoViewed(counts, numberOfNeighbours):
+    """
+    The numberOfNeighbours most co-viewed columns of every row, best first, padded with -1.
+    """
+    numberOfBooks = counts.shape[0]
+    neighbours = numpy.full((numberOfBooks, numberOfNeighbours), -1, dtype=numpy.int64)
+    coViews = numpy.zeros((numberOfBooks, numberOfNeighbours), dtype=numpy.int32)
+
+    counts.sort_indices()
+    for row in range(numberOfBooks):
+        start, end = counts.indptr[row], counts.indptr[row + 1]
+        rowCounts = counts.data[start:end]
+        best = similarityOperations.topIndices(rowCounts, numberOfNeighbours)
+        best = best[rowCounts[best] >= MINIMUM_CO_VIEWS]
+        neighbours[row, :len(best)] = counts.indices[start:end][best]
+        coViews[row, :len(best)] = rowCounts[best]
+    return neighbours, coViews
+
+
+def buildAlsoViewedModel(numberOfNeighbours=NUMBER_OF_NEIGHBOURS, since=None):
+    """
+    Batch job behind the "readers also viewed" row: counts how often two books are viewed in the same
+    session and keeps the most co-viewed books for every book. Returns the number of books with neighbours.
+    """
+    bookIds = numpy.array(Book.objects.order_by('id').values_list('id', flat=True), dtype=numpy.int64)
+    rowById = featureStoreOperations.denseIndex(bookIds)
+    sessions = (
+        featureStoreOperations.lookupRows(rowById, session).tolist() for session in viewSessions(since)
+    )
+
+    neighbourRows, coViews = topCoViewed(coViewCounts(sessions, len(bookIds)), numberOfNeighbours)
+    hasNeighbours = neighbourRows[:, 0] >= 0
+    artefactOperations.saveArtefact(
+        ALSO_VIEWED_ARTEFACT,
+        {
+            'bookIds': bookIds[hasNeighbours],
+            'neighbours': numpy.where(neighbourRows >= 0, bookIds[neighbourRows], -1)[hasNeighbours],
+            'coViews': coViews[hasNeighbours]
+        }
+    )
+    return int(hasNeighbours.sum())
+
+
+def loadAlsoViewedModel():
+    return artefactOperations.loadArtefact(ALSO_VIEWED_ARTEFACT)
+
+
+def alsoViewedBookIds(bookId):
+    """
+    Book ids most often viewed in the same session as bookId, best first. Empty if the model has not been
+    built or the book has not been co-viewed often enough.
+    """
+    model = loadAlsoViewedModel()
+    if model is None:
+        return []
+
+    row = featureStoreOperations.artefactRows(model, [bookId])[0]
+    if row < 0:
+        return []
+    return [neighbour for neighbour in model['neighbours'][row].tolist() if neighbour >= 0]
@@ -0,0 +1,235 @@
+import functools
+
+import numpy
+from scipy import sparse
+
+from bookrec.operations import (
+    artefactOperations,
+    similarityOperations,
+    textFeatureOperations
+)
+
+ANN_INDEX_ARTEFACT = 'ann-index'
+DEFAULT_NUMBER_OF_TABLES = 8
+DEFAULT_NUMBER_OF_BITS = 16
+DEFAULT_NUMBER_OF_PROBES = 4
+DEFAULT_SKETCH_DIMENSION = 4096
+BUILD_CHUNK_SIZE = 16384
+
+
+def countSketch(numberOfFeatures, sketchDimension, seed):
+    """
+    Feature-hashing matrix with one +1/-1 per input feature. X @ sketch preserves inner products in expectation
+    and shrinks n-gram vocabularies to a size where dense random planes are cheap.
+    """
+    randomState = numpy.random.default_rng(seed)
+    return sparse.csr_matrix(
+        (
+            randomState.choice(numpy.array([-1.0, 1.0], dtype=numpy.float32), size=numberOfFeatures),
+            randomState.integers(0, sketchDimension, size=numberOfFeatures),
+            numpy.arange(numberOfFeatures + 1)
+        ),
+        shape=(numberOfFeatures, sketchDimension)
+    )
+
+
+def gaussianPlanes(sketchDimension, numberOfPlanes, seed):
+    randomState = numpy.random.default_rng(seed + 1)
+    return randomState.standard_normal((sketchDimension, numberOfPlanes), dtype=numpy.float32)
+
+
+def packBits(projections, numberOfTables, numberOfBits):
+    """
+    Turns the sign of each projection into one integer bucket code per table.
+    """
+    bits = (projections > 0).reshape(projections.shape[0], numberOfTables, numberOfBits)
+    weights = numpy.left_shift(numpy.uint64(1), numpy.arange(numberOfBits, dtype=numpy.uint64))
+    return (bits.astype(numpy.uint64) * weights).sum(axis=2, dtype=numpy.uint64)
+
+
+class RandomProjectionIndex:
+    """
+    Approximate nearest-neighbour index over l2-normalised book vectors using random-projection LSH.
+
+    Each of numberOfTables hash tables buckets vectors by the signs of numberOfBits random projections
+    (a count sketch followed by Gaussian hyperplanes, so sparse TF-IDF rows never project to exactly zero).
+    A query reads its own bucket plus numberOfProbes neighbouring buckets per table (flipping the bits
+    whose projections were closest to zero), then reranks the candidates with the exact cosine similarity.
+    More tables or probes raise recall, more bits make buckets smaller and queries faster.
+    """
+
+    def __init__(self, numberOfTables=DEFAULT_NUMBER_OF_TABLES, numberOfBits=DEFAULT_NUMBER_OF_BITS,
+                 numberOfProbes=DEFAULT_NUMBER_OF_PROBES, seed=0, sketchDimension=DEFAULT_SKETCH_DIMENSION):
+        if not 1 <= numberOfBits <= 63:
+            raise ValueError(f'numberOfBits must be between 1 and 63, got {numberOfBits}')
+
+        self.numberOfTables = numberOfTables
+        self.numberOfBits = numberOfBits
+        self.numberOfProbes = numberOfProbes
+        self.seed = seed
+        self.sketchDimension = sketchDimension
+        self.sketch = None
+        self.planes = None
+        self.vectors = None
+        self.ids = None
+        self.sortedCodes = None
+        self.sortedRows = None
+
+    def build(self, vectors, ids=None):
+        self.vectors = sparse.csr_matrix(vectors, dtype=numpy.float32)
+        numberOfVectors = self.vectors.shape[0]
+        self.ids = numpy.arange(numberOfVectors, dtype=numpy.int64) if ids is None else numpy.asarray(ids)
+        self.sketch = countSketch(self.vectors.shape[1], self.sketchDimension, self.seed)
+        self.planes = gaussianPlanes(self.sketchDimension, self.numberOfTables * self.numberOfBits, self.seed)
+
+        codes = numpy.empty((numberOfVectors, self.numberOfTables), dtype=numpy.uint64)
+        for start in range(0, numberOfVectors, BUILD_CHUNK_SIZE):
+            projections = self.project(self.vectors[start:start + BUILD_CHUNK_SIZE])
+            codes[start:start + BUILD_CHUNK_SIZE] = packBits(projections, self.numberOfTables, self.numberOfBits)
+
+        # One sorted code column per table, so a bucket is a contiguous slice found by binary search.
+        self.sortedRows = numpy.argsort(codes, axis=0, kind='stable').astype(numpy.int64)
+        self.sortedCodes = numpy.take_along_axis(codes, self.sortedRows, axis=0)
+        return self
+
+    def project(self, vectors):
+        return (sparse.csr_matrix(vectors, dtype=numpy.float32) @ self.sketch) @ self.planes
+
+    def probeCodes(self, projection):
+        projection = projection.reshape(self.numberOfTables, self.numberOfBits)
+        codes = packBits(projection.reshape(1, -1), self.numberOfTables, self.numberOfBits)[0]
+        probes = [codes]
+
+        numberOfProbes = min(self.numberOfProbes, self.numberOfBits)
+        if numberOfProbes > 0:
+            leastCertainBits = numpy.argsort(numpy.abs(projection), axis=1)[:, :numberOfProbes]
+            for probe in range(numberOfProbes):
+                flips = numpy.left_shift(numpy.uint64(1), leastCertainBits[:, probe].astype(numpy.uint64))
+                probes.append(numpy.bitwise_xor(codes, flips))
+        return probes
+
+    def candidates(self, vector):
+        projection = numpy.asarray(self.project(vector)).ravel()
+        buckets = []
+        for codes in self.probeCodes(projection):
+            for table in range(self.numberOfTables):
+                column = self.sortedCodes[:, table]
+                start = numpy.searchsorted(column, codes[table], side='left')
+                end = numpy.searchsorted(column, codes[table], side='right')
+                if start < end:
+                    buckets.append(self.sortedRows[start:end, table])
+
+        if not buckets:
+            return numpy.empty(0, dtype=numpy.int64)
+        return numpy.unique(numpy.concatenate(buckets))
+
+    def query(self, vector, k, exclude=None):
+        """
+        Returns (ids, scores) of the approximately k most similar vectors, best first.
+        exclude is an optional collection of ids to leave out, e.g. the query book itself.
+        """
+        excludeRows = None
+        if exclude is not None:
+            excludeRows = numpy.flatnonzero(numpy.isin(self.ids, numpy.asarray(list(exclude))))
+        rows, scores = self.queryRows(vector, k, excludeRows)
+        return self.ids[rows], scores
+
+    def queryRows(self, vector, k, excludeRows=None):
+        """
+        Like query, but takes and returns rows of the indexed vectors instead of their ids.
+        """
+        rows = self.candidates(vector)
+        if excludeRows is not None and len(rows):
+            rows = rows[~numpy.isin(rows, excludeRows)]
+        if not len(rows):
+            return rows, numpy.empty(0, dtype=numpy.float32)
+
+        scores = (self.vectors[rows] @ sparse.csr_matrix(vector, dtype=numpy.float32).T).toarray().ravel()
+        best = similarityOperations.topIndices(scores, k)
+        return rows[best], scores[best]
+
+    def exactQuery(self, vector, k, exclude=None):
+        """
+        Brute-force scan over every vector; the baseline the approximate query is measured against.
+        """
+        scores = (self.vectors @ sparse.csr_matrix(vector, dtype=numpy.float32).T).toarray().ravel()
+        if exclude is not None:
+            scores[numpy.isin(self.ids, numpy.asarray(list(exclude)))] = -numpy.inf
+        best = similarityOperations.topIndices(scores, k)
+        best = best[scores[best] > -numpy.inf]
+        return self.ids[best], scores[best]
+
+    def save(self, name=ANN_INDEX_ARTEFACT):
+        """
+        Persists the built index as a memory-mapped artefact. The count sketch is not stored: it is regenerated
+        from the seed on load. Returns the saved version.
+        """
+        return artefactOperations.saveArtefact(
+            name,
+            {
+                'planes': self.planes,
+                'sortedCodes': self.sortedCodes,
+                'sortedRows': self.sortedRows,
+                'ids': self.ids,
+                'vectors': self.vectors,
+            },
+            metadata={
+                'numberOfTables': self.numberOfTables,
+                'numberOfBits': self.numberOfBits,
+                'numberOfProbes': self.numberOfProbes,
+                'seed': self.seed,
+                'sketchDimension': self.sketchDimension,
+            }
+        )
+
+    @classmethod
+    def load(cls, name=ANN_INDEX_ARTEFACT):
+        """
+        The saved index, sharing the artefact's memory-mapped arrays, or None if none has been saved.
+        """
+        artefact = artefactOperations.loadArtefact(name)
+        if artefact is None:
+            return None
+
+        index = cls(**artefact.metadata)
+        index.planes = artefact['planes']
+        index.sortedCodes = artefact['sortedCodes']
+        index.sortedRows = artefact['sortedRows']
+        index.ids = artefact['ids']
+        index.vectors = artefact['vectors']
+        index.sketch = countSketch(index.vectors.shape[1], index.sketchDimension, index.seed)
+        return index
+
+
+def approximateNeighbours(tfvMatrix, numberOfNeighbours, index=None):
+    """
+    Drop-in replacement for similarityOperations.topNeighbours that queries an LSH index instead of scanning
+    every book. Pass an index already built over tfvMatrix to reuse it. Rows with fewer candidates than
+    numberOfNeighbours are padded with -1.
+    """
+    if index is None:
+        index = RandomProjectionIndex().build(tfvMatrix)
+    neighbours = numpy.full((tfvMatrix.shape[0], numberOfNeighbours), -1, dtype=numpy.int64)
+    for row in range(tfvMatrix.shape[0]):
+        rows, _ = index.queryRows(tfvMatrix[row], numberOfNeighbours, excludeRows=[row])
+        neighbours[row, :len(rows)] = rows
+    return neighbours
+
+
+def buildApproximateSimilarityIndex(numberOfNeighbours=similarityOperations.NUMBER_OF_NEIGHBOURS):
+    """
+    similarityOperations.buildSimilarityIndex with the neighbours found through an LSH index over the text
+    features. The index is saved too, keyed by book id, so it can be loaded instead of rebuilt.
+    Returns the number of books indexed.
+    """
+    textFeatureOperations.buildTextFeatures()
+    features = textFeatureOperations.loadTextFeatures()
+    if features is None:
+        return 0
+
+    tfvMatrix = features.matrix()
+    index = RandomProjectionIndex().build(tfvMatrix, features.bookIds)
+    index.save()
+    return similarityOperations.saveSimilarityIndex(
+        features.bookIds, tfvMatrix, numberOfNeighbours, functools.partial(approximateNeighbours, index=index)
+    )
@@ -0,0 +1,171 @@
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy
+from django.conf import settings
+from django.utils import timezone
+from scipy import sparse
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+VERSIONS_TO_KEEP = 2
+SPARSE_COMPONENTS = ('data', 'indices', 'indptr')
+
+_loadedArtefacts = {}
+_loadedArtefactsLock = threading.Lock()
+
+
+class Artefact:
+    """
+    One version of a model's arrays, memory-mapped read-only so every worker process shares the page cache.
+    Sparse matrices are stored as their CSR component files and reassembled without copying.
+    """
+
+    def __init__(self, name, version, arrays, metadata):
+        self.name = name
+        self.version = version
+        self.arrays = arrays
+        self.metadata = metadata
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def __contains__(self, key):
+        return key in self.arrays
+
+
+def getArtefactDirectory(name):
+    return os.path.join(settings.RECOMMENDATION_MODELS_DIR, name)
+
+
+@contextlib.contextmanager
+def manifestLock(directory):
+    """
+    Exclusive lock on the artefact's directory, held across publishing a version and pruning old ones so
+    concurrent saves, from other workers or hosts sharing the directory, never interleave.
+    """
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lockFile:
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+
+def saveArtefact(name, arrays, metadata=None):
+    """
+    Writes arrays (numpy arrays or scipy sparse matrices) as a new version of the named artefact and
+    publishes it by atomically replacing the manifest. Workers pick it up on their next loadArtefact.
+    The arrays are written to a private temporary directory first; if a save that started later has been
+    published in the meantime, this older version is discarded instead. Returns the new version.
+    """
+    directory = getArtefactDirectory(name)
+    os.makedirs(directory, exist_ok=True)
+    version = str(time.time_ns())
+    temporaryDirectory = tempfile.mkdtemp(dir=directory, prefix=f'.{version}-')
+
+    try:
+        files = {}
+        for key, value in arrays.items():
+            if sparse.issparse(value):
+                value = value.tocsr()
+                for component in SPARSE_COMPONENTS:
+                    numpy.save(os.path.join(temporaryDirectory, f'{key}.{component}.npy'), getattr(value, component))
+                files[key] = {'format': 'csr', 'shape': list(value.shape)}
+            else:
+                numpy.save(os.path.join(temporaryDirectory, f'{key}.npy'), numpy.ascontiguousarray(value))
+                files[key] = {'format': 'npy'}
+
+        manifest = {
+            'version': version,
+            'createdAt': timezone.now().isoformat(),
+            'files': files,
+            'metadata': metadata or {},
+        }
+        with manifestLock(directory):
+            current = readManifest(name)
+            if current is None or int(current['version']) < int(version):
+                os.rename(temporaryDirectory, os.path.join(directory, version))
+                writeManifest(directory, manifest)
+                pruneArtefactVersions(name, version)
+    finally:
+        shutil.rmtree(temporaryDirectory, ignore_errors=True)
+    return version
+
+
+def writeManifest(directory, manifest):
+    with tempfile.NamedTemporaryFile('w', dir=directory, prefix=f'.{MANIFEST_FILE}-', delete=False) as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(file.name, os.path.join(directory, MANIFEST_FILE))
+
+
+def pruneArtefactVersions(name, currentVersion):
+    """
+    Keeps the newest versions only. Workers still mapping a removed version keep working: the files
+    stay alive until their mappings are closed. Call with the manifest lock held.
+    """
+    directory = getArtefactDirectory(name)
+    versions = sorted(
+        (entry for entry in os.listdir(directory) if entry.isdigit() and os.path.isdir(os.path.join(directory, entry))),
+        key=int
+    )
+    for version in versions[:-VERSIONS_TO_KEEP]:
+        if version != currentVersion:
+            shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
+
+
+def readManifest(name):
+    try:
+        with open(os.path.join(getArtefactDirectory(name), MANIFEST_FILE)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def mapArtefact(name, manifest):
+    versionDirectory = os.path.join(getArtefactDirectory(name), manifest['version'])
+    arrays = {}
+    for key, description in manifest['files'].items():
+        if description['format'] == 'csr':
+            data, indices, indptr = (
+                numpy.load(os.path.join(versionDirectory, f'{key}.{component}.npy'), mmap_mode='r')
+                for component in SPARSE_COMPONENTS
+            )
+            arrays[key] = sparse.csr_matrix((data, indices, indptr), shape=tuple(description['shape']), copy=False)
+        else:
+            arrays[key] = numpy.load(os.path.join(versionDirectory, f'{key}.npy'), mmap_mode='r')
+    return Artefact(name, manifest['version'], arrays, manifest['metadata'])
+
+
+def loadArtefact(name):
+    """
+    Returns the current version of the named artefact, or None if it has never been saved.
+    Costs one stat of the manifest per call; a new version is mapped the first time it is seen.
+    """
+    manifestPath = os.path.join(getArtefactDirectory(name), MANIFEST_FILE)
+    try:
+        modifiedTime = os.path.getmtime(manifestPath)
+    except OSError:
+        return None
+
+    with _loadedArtefactsLock:
+        loaded = _loadedArtefacts.get(name)
+        if loaded is not None and loaded['modifiedTime'] == modifiedTime:
+            return loaded['artefact']
+
+        manifest = readManifest(name)
+        if manifest is None:
+            return loaded['artefact'] if loaded is not None else None
+
+        if loaded is None or loaded['artefact'].version != manifest['version']:
+            artefact = mapArtefact(name, manifest)
+        else:
+            artefact = loaded['artefact']
+        _loadedArtefacts[name] = {'modifiedTime': modifiedTime, 'artefact': artefact}
+        return artefact
@@ -1,28 +1,46 @@
 import datetime
-import operator
-from functools import reduce
+import hashlib
 
 import numpy
-import pandas
-import requests
-from django.contrib.auth.models import User
-from django.core.cache import cache
-from django.db.models import Q
-from scipy.sparse import csr_matrix
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.metrics.pairwise import sigmoid_kernel
-from sklearn.preprocessing import MinMaxScaler
-
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, When
+from django.db.models.functions import Greatest
+
+from bookrec.operations import (
+    alsoViewedOperations,
+    cacheOperations,
+    collaborativeOperations,
+    factorisationOperations,
+    featureStoreOperations,
+    genreOperations,
+    googleBooksOperations,
+    similarityOperations,
+    tasteOperations,
+    textFeatureOperations,
+    trendingOperations,
+    vectorStoreOperations
+)
 from core.models import (
     Book,
     BookReview,
-    Category
+    BookScore,
+    Category,
+    Profile,
+    Recommendation
 )
-from core.serializers import (
-    BookSerializerV1,
-    BookSerializerV2,
-    BookReviewSerializerV2
+
+# Names the recommenders below report their time budget metrics under, see cacheOperations.budgetMetrics.
+BUDGETED_RECOMMENDERS = (
+    'recentlyAddedBooks',
+    'trendingBooks',
+    'booksBasedOnRatings',
+    'booksBasedOnViewings',
+    'booksBasedOnRating',
+    'otherUsersFavouriteBooks',
+    'personalisedBooks',
+    'similarBooks',
+    'alsoViewedBooks',
 )
 
 
@@ -96,60 +114,106 @@ class ApiBook:
         self.averageRating = averageRating
         self.ratingsCount = ratingsCount
 
+    def toBook(self):
+        return Book(
+            title=self.title,
+            authors=self.authors,
+            publisher=self.publisher,
+            publishedDate=self.publishedDate,
+            description=self.description,
+            isbn13=self.isbn13,
+            categories=self.categories,
+            thumbnail=self.thumbnail,
+            selfLink=self.selfLink,
+            averageRating=self.averageRating,
+            ratingsCount=self.ratingsCount
+        )
+
 
-def performComplexBookSearch(query):
-    attributesToSearch = ['title', 'authors', 'publisher', 'description', 'isbn13', 'categories']
-    filterList = [
-        reduce(operator.or_, [Q(**{f'{a}__icontains': query}) for a in attributesToSearch])
+def splitCategories(volume):
+    categories = volume.get('volumeInfo').get('categories') or []
+    return [splitItem.strip() for category in categories for splitItem in category.split('/')]
+
+
+def apiBookFromVolume(item, isbn13, additionalData):
+    """
+    Normalises a Google Books volume, plus its detail document when one was fetched, into an ApiBook.
+    Used by both the live search and the import_books command, so both store books the same way.
+    """
+    return ApiBook(
+        title=item.get('volumeInfo').get('title'),
+        authors=handleAuthor(item, additionalData),
+        publisher=item.get('volumeInfo').get('publisher'),
+        publishedDate=handleMissingDate(isbn13, item.get('volumeInfo').get('publishedDate')),
+        description=item.get('volumeInfo').get('description'),
+        isbn13=isbn13,
+        categories=list(set(splitCategories(item) + splitCategories(additionalData))),
+        thumbnail=getThumbnailForBook(additionalData),
+        selfLink=item.get('selfLink'),
+        averageRating=getAverageRatingValue(item, additionalData),
+        ratingsCount=getRatingsCountValue(item, additionalData)
+    )
+
+
+def performComplexBookSearch(query, isbn13s=()):
+    """
+    Full-text search over the stored, GIN-indexed Book.searchVector (title > authors > categories >
+    description), best match first. The query takes web search syntax ("quoted phrases", or, -excluded).
+    Books whose isbn13 is the query or in isbn13s are always included.
+    """
+    searchQuery = SearchQuery(query, search_type='websearch', config=Book.SEARCH_CONFIG)
+    return Book.objects.filter(
+        Q(searchVector=searchQuery) | Q(isbn13=query.strip()) | Q(isbn13__in=list(isbn13s))
+    ).annotate(rank=SearchRank(F('searchVector'), searchQuery)).defer('searchVector').order_by('-rank', 'id')
+
+
+def fuzzyShelfSearch(records, query):
+    """
+    Typo-tolerant shelf search: keeps the books (or reviews) whose title, authors or comment contain a word
+    similar to query and orders them by the best pg_trgm word similarity. Titles, the stored authors text and
+    comments are all matched through their trigram GIN indexes.
+    """
+    prefix = 'book__' if records.model is BookReview else ''
+    matches = (
+        Q(**{f'{prefix}title__trigram_word_similar': query})
+        | Q(**{f'{prefix}authorsText__trigram_word_similar': query})
+    )
+    similarities = [
+        TrigramWordSimilarity(query, f'{prefix}title'), TrigramWordSimilarity(query, f'{prefix}authorsText')
     ]
-    return Book.objects.filter(reduce(operator.and_, filterList)).distinct()
+    if records.model is BookReview:
+        matches |= Q(comment__trigram_word_similar=query)
+        similarities.append(TrigramWordSimilarity(query, 'comment'))
+
+    return records.filter(matches).annotate(fuzzyScore=Greatest(*similarities)).order_by('-fuzzyScore', 'pk')
+
+
+def getIsbn13(item):
+    industryIdentifiers = item.get('volumeInfo').get('industryIdentifiers') or []
+    return next((i.get('identifier') for i in industryIdentifiers if i.get('type') == 'ISBN_13'), None)
 
 
 def googleBooksAPIRequests(query):
-    response = requests.get('https://www.googleapis.com/books/v1/volumes?q=' + query)
-    if response.json().get('totalItems') == 0:
-        return []
+    items = [item for item in googleBooksOperations.searchVolumes(query) if item.get('volumeInfo')]
+    if not items:
+        return performComplexBookSearch(query)
 
     newBooks = []
     apiBooks = []
     combinedCategories = []
+    isbn13s = [getIsbn13(item) for item in items]
+    volumeDetails = googleBooksOperations.fetchVolumeDetails(
+        item.get('selfLink') for item, isbn13 in zip(items, isbn13s) if isbn13 is not None
+    )
 
-    for item in response.json()['items']:
-        industryIdentifiers = item.get('volumeInfo').get('industryIdentifiers')
-        if industryIdentifiers is None:
-            continue
-
-        isbn13 = next((i.get('identifier') for i in industryIdentifiers if i.get('type') == 'ISBN_13'), None)
+    for item, isbn13 in zip(items, isbn13s):
         if isbn13 is None:
             continue
 
-        categories = item.get('volumeInfo').get('categories') or []
-        baseCategories = [splitItem.strip() for category in categories for splitItem in category.split('/')]
-
-        selfLink = item.get('selfLink')
-        additionalData = requests.get(selfLink).json()
-
-        categories = additionalData.get('volumeInfo').get('categories') or []
-        additionalCategories = [splitItem.strip() for category in categories for splitItem in category.split('/')]
-
-        joinedCategories = list(set(baseCategories + additionalCategories))
-        combinedCategories += joinedCategories
-
-        apiBooks.append(
-            ApiBook(
-                title=item.get('volumeInfo').get('title'),
-                authors=handleAuthor(item, additionalData),
-                publisher=item.get('volumeInfo').get('publisher'),
-                publishedDate=handleMissingDate(isbn13, item.get('volumeInfo').get('publishedDate')),
-                description=item.get('volumeInfo').get('description'),
-                isbn13=isbn13,
-                categories=list(set(baseCategories + additionalCategories)),
-                thumbnail=getThumbnailForBook(additionalData),
-                selfLink=selfLink,
-                averageRating=getAverageRatingValue(item, additionalData),
-                ratingsCount=getRatingsCountValue(item, additionalData)
-            )
-        )
+        additionalData = volumeDetails.get(item.get('selfLink')) or googleBooksOperations.emptyVolume()
+        apiBook = apiBookFromVolume(item, isbn13, additionalData)
+        combinedCategories += apiBook.categories
+        apiBooks.append(apiBook)
 
     isbn13FromApi = [book.isbn13 for book in apiBooks]
     booksFromApiThatMatchDB = Book.objects.filter(isbn13__in=isbn13FromApi)
@@ -157,21 +221,7 @@ def googleBooksAPIRequests(query):
 
     for apiBook in apiBooks:
         if apiBook.isbn13 not in booksFromApiThatMatchDBIsbn13:
-            newBooks.append(
-                Book(
-                    title=apiBook.title,
-                    authors=apiBook.authors,
-                    publisher=apiBook.publisher,
-                    publishedDate=apiBook.publishedDate,
-                    description=apiBook.description,
-                    isbn13=apiBook.isbn13,
-                    categories=apiBook.categories,
-                    thumbnail=apiBook.thumbnail,
-                    selfLink=apiBook.selfLink,
-                    averageRating=apiBook.averageRating,
-                    ratingsCount=apiBook.ratingsCount
-                )
-            )
+            newBooks.append(apiBook.toBook())
 
     combinedCategoriesFromApi = list(set(combinedCategories))
     categoriesFromApiThatMatchDB = list(
@@ -184,17 +234,20 @@ def googleBooksAPIRequests(query):
         ]
     )
     newBooksIsbn = [book.isbn13 for book in Book.objects.bulk_create(newBooks)]
-    newBooksQueryset = Book.objects.filter(isbn13__in=newBooksIsbn)
-    return booksFromApiThatMatchDB.union(newBooksQueryset, performComplexBookSearch(query))
+    if newBooksIsbn:
+        Book.refreshSearchVectors(Book.objects.filter(isbn13__in=newBooksIsbn))
+        newBookIds = list(Book.objects.filter(isbn13__in=newBooksIsbn).values_list('id', flat=True))
+        transaction.on_commit(lambda: genreOperations.addBooks(newBookIds))
+    return performComplexBookSearch(query, isbn13FromApi)
 
 
 def recentlyAddedBooks():
-    queryset = cache.get('recently-added-books')
-    if queryset:
-        return queryset
+    return cacheOperations.getOrCompute('recently-added-books', recentlyAddedBookItems, name='recentlyAddedBooks')
 
+
+def recentlyAddedBookItems():
     books = Book.objects.order_by('-id').only('title', 'thumbnail', 'isbn13')[:20]
-    queryset = [
+    return [
         {
             'title': book.title,
             'thumbnail': book.thumbnail,
@@ -202,205 +255,349 @@ def recentlyAddedBooks():
         }
         for book in books
     ]
-    cache.set('recently-added-books', queryset, timeout=30)
-    return queryset
 
 
-def booksBasedOnRatings():
-    queryset = cache.get('books-based-on-ratings')
-    if queryset:
-        return queryset
+def trendingBooks():
+    """
+    Books with the most time-decayed activity (views, shelf additions, comments), read from the trending
+    sorted set kept current by logOperations.log.
+    """
+    return cacheOperations.getOrCompute(
+        'trending-books-row', trendingBookItems, softTimeout=10, name='trendingBooks', fallback=popularFallbackItems
+    )
 
-    allBooks = Book.objects.all().prefetch_related('favouriteRead')
-    if allBooks.count() == 0:
-        return []
 
-    bookSerializer = BookSerializerV2(allBooks, many=True)
+def trendingBookItems():
+    isbn13s = trendingOperations.trendingIsbn13s(20)
+    booksByIsbn13 = Book.objects.only('title', 'thumbnail', 'isbn13').in_bulk(isbn13s, field_name='isbn13')
+    return [
+        {
+            'title': booksByIsbn13[isbn13].title,
+            'thumbnail': booksByIsbn13[isbn13].thumbnail,
+            'url': booksByIsbn13[isbn13].getUrl()
+        }
+        for isbn13 in isbn13s if isbn13 in booksByIsbn13
+    ]
 
-    # Implementing weighted average for each book's average rating // Non - personalized
-    df = pandas.DataFrame(bookSerializer.data)
-    v = df['ratingsCount']
-    R = df['averageRating']
-    m = v.quantile(0.70)
-    C = R.mean()
 
-    df['weightedAverage'] = ((R * v) + (C * m)) / (v + m)
+def minMaxScale(values):
+    """
+    Same result as sklearn's MinMaxScaler on a single column: constant columns scale to 0.
+    """
+    valueRange = values.max() - values.min()
+    if valueRange == 0:
+        return numpy.zeros_like(values)
+    return (values - values.min()) / valueRange
 
-    # This is for recommending books to the users based on scaled weighting (50%) and favouritesCount (50%).
-    scaling = MinMaxScaler()
-    bookScaled = scaling.fit_transform(df[['weightedAverage', 'favouriteReadCount']])
-    bookNormalized = pandas.DataFrame(bookScaled, columns=['weightedAverage', 'favouriteReadCount'])
 
-    df[['normalizedWeightAverage', 'normalizedPopularity']] = bookNormalized
-    df['score'] = df['normalizedWeightAverage'] * 0.5 + df['normalizedPopularity'] * 0.5
-    booksScoredFromDf = df.sort_values(['score'], ascending=False)
-    finalResult = list(booksScoredFromDf[['isbn13']].head(20)['isbn13'])
+def weightedRatingScores(averageRatings, ratingsCounts, favouriteReadCounts):
+    """
+    Non-personalised popularity score: IMDb-style weighted average rating scaled to [0, 1] (50%)
+    plus the scaled number of users that favourited the book (50%).
+    """
+    m = numpy.quantile(ratingsCounts, 0.70)
+    C = averageRatings.mean()
+    weightedAverage = numpy.divide(
+        averageRatings * ratingsCounts + C * m,
+        ratingsCounts + m,
+        out=numpy.full_like(averageRatings, C),
+        where=(ratingsCounts + m) > 0
+    )
+    return minMaxScale(weightedAverage) * 0.5 + minMaxScale(favouriteReadCounts) * 0.5
+
+
+def refreshBookScores():
+    """
+    Recomputes the weighted-rating score of every book from one aggregated query and replaces the
+    BookScore table that booksBasedOnRatings reads from. Returns the number of books scored.
+    """
+    rows = list(
+        Book.objects.annotate(favouriteReadCount=Count('favouriteRead')).values_list(
+            'id', 'averageRating', 'ratingsCount', 'favouriteReadCount'
+        )
+    )
+    if not rows:
+        BookScore.objects.all().delete()
+        return 0
+
+    bookIds, averageRatings, ratingsCounts, favouriteReadCounts = zip(*rows)
+    scores = weightedRatingScores(
+        numpy.array(averageRatings, dtype=numpy.float64),
+        numpy.array([count or 0 for count in ratingsCounts], dtype=numpy.float64),
+        numpy.array(favouriteReadCounts, dtype=numpy.float64)
+    )
 
-    books = Book.objects.filter(isbn13__in=finalResult)
-    queryset = [
+    with transaction.atomic():
+        BookScore.objects.all().delete()
+        BookScore.objects.bulk_create(
+            [BookScore(book_id=bookId, score=score) for bookId, score in zip(bookIds, scores.tolist())],
+            batch_size=5000
+        )
+    return len(bookIds)
+
+
+def booksBasedOnRatings():
+    return cacheOperations.getOrCompute('books-based-on-ratings', popularBookItems, name='booksBasedOnRatings')
+
+
+def popularBookItems():
+    # Empty until `manage.py refresh_book_scores` has run; the request never scores the catalogue itself.
+    bookScores = BookScore.objects.select_related('book').only(
+        'book__title', 'book__thumbnail', 'book__isbn13'
+    ).order_by('-score')[:20]
+    return [
         {
-            'title': book.title,
-            'thumbnail': book.thumbnail,
-            'url': book.getUrl()
+            'title': bookScore.book.title,
+            'thumbnail': bookScore.book.thumbnail,
+            'url': bookScore.book.getUrl()
         }
-        for book in books
+        for bookScore in bookScores
     ]
-    cache.set('books-based-on-ratings', queryset, timeout=30)
-    return queryset
 
 
 def booksBasedOnViewings(request):
-    queryset = cache.get(f'books-based-on-ratings-{request.user.id}')
-    if queryset:
-        return queryset
-
-    history = request.session.get('history', [])
-    if not history:
+    """
+    Content-based recommendations from the user's persisted taste vector, which update_taste_vectors folds
+    viewed, favourited and rated books into. Users without one yet are scored from their session history instead.
+    """
+    history = list(request.session.get('history', []))
+    userId = request.user.id if request.user.is_authenticated else None
+    if not history and userId is None:
         return []
 
-    allBooks = Book.objects.filter(description__isnull=False)
-    allBooksSerializer = BookSerializerV1(allBooks, many=True)
-    allBooksDf = pandas.DataFrame(allBooksSerializer.data)
-
-    tfv = TfidfVectorizer(
-        max_features=None,
-        strip_accents='unicode',
-        analyzer='word',
-        token_pattern=r'\w{1,}',
-        ngram_range=(1, 3),
-        stop_words='english'
+    # Anonymous rows depend only on the viewing history, so they are cached per history rather than per user.
+    cacheKey = f'books-based-on-viewings-{userId}' if userId is not None else (
+        f'books-based-on-viewings-history-{hashlib.sha1(",".join(history).encode()).hexdigest()}'
+    )
+    return cacheOperations.getOrCompute(
+        cacheKey,
+        lambda: tasteBookItems(userId, history),
+        name='booksBasedOnViewings',
+        fallback=popularFallbackItems
     )
-    tfvMatrix = tfv.fit_transform(allBooksDf['description'])
-    sigmoidKernel = sigmoid_kernel(tfvMatrix, tfvMatrix)
-    indices = pandas.Series(allBooksDf.index, index=allBooksDf['title']).drop_duplicates()
-
-    viewedBooks = Book.objects.filter(isbn13__in=history, description__isnull=False)
-    combinedScores = pandas.Series(0, index=allBooksDf.index)
-    for viewedBook in viewedBooks:
-        try:
-            idx = indices[viewedBook.title].iloc[0]
-        except AttributeError:
-            idx = indices[viewedBook.title]
-        combinedScores += pandas.Series(sigmoidKernel[idx])
-
-    viewedIndices = [
-        indices[book.title].iloc[0]
-        if hasattr(indices[book.title], 'iloc') else indices[book.title]
-        for book in viewedBooks
+
+
+def tasteBookItems(userId, history):
+    viewedBookIds = list(Book.objects.filter(isbn13__in=history).values_list('id', flat=True)) if history else []
+    bookIds = tasteOperations.tasteRecommendations(userId, viewedBookIds) if userId is not None else None
+    if bookIds is not None:
+        return carouselItems(bookIds)
+    return viewedBookItems(history) if history else []
+
+
+def viewedBookItems(history):
+    """
+    Books most similar to the viewed ones under the summed sigmoid kernel. Unlike the original description-only
+    TF-IDF, this scores the shared hashed text features: description, authors and categories together, with terms
+    in fewer than textFeatureOperations.MIN_DOCUMENT_FREQUENCY books ignored, and books without a description
+    are candidates too.
+    """
+    features = textFeatureOperations.loadTextFeatures()
+    if features is None:
+        return []
+
+    viewedBookIds = list(Book.objects.filter(isbn13__in=history).values_list('id', flat=True))
+    viewedRows = [int(row) for row in features.rowsFor(viewedBookIds) if row >= 0] if viewedBookIds else []
+    if not viewedRows:
+        return []
+
+    # Summed sigmoid kernel (gamma = 1 / n_features, coef0 = 1) of the viewed books against the catalogue.
+    similarities = features.similarities(features.vectors(viewedRows))
+    combinedScores = numpy.tanh(similarities / textFeatureOperations.NUMBER_OF_FEATURES + 1.0).sum(axis=0)
+    combinedScores[viewedRows] = -numpy.inf
+    topRows = [
+        row for row in similarityOperations.topIndices(combinedScores, 20) if combinedScores[row] > -numpy.inf
     ]
-    combinedScores.iloc[viewedIndices] = 0
+    return carouselItems(features.bookIds[topRows].tolist())
+
+
+def booksInOrder(bookIds):
+    """
+    Queryset of the given books that keeps the order of bookIds.
+    """
+    ordering = Case(*[When(id=bookId, then=position) for position, bookId in enumerate(bookIds)])
+    return Book.objects.filter(id__in=bookIds).order_by(ordering)
 
-    topIndices = combinedScores.sort_values(ascending=False).head(20).index
-    topBooks = allBooksDf.iloc[topIndices]
 
-    books = Book.objects.filter(isbn13__in=topBooks['isbn13']).distinct()
-    queryset = [
+def carouselItems(bookIds):
+    """
+    Title, thumbnail and url of the given books in the order of bookIds, as rendered by the carousels.
+    Books are read from the feature store; only books added since it was built are fetched from the database,
+    and books deleted since are dropped with one primary key lookup. Titles and thumbnails are as of the last
+    `manage.py build_feature_store`, which `manage.py build_recommendations --rebuild-models` reruns.
+    """
+    bookStore = featureStoreOperations.loadBookStore()
+    booksById = bookStore.records(bookIds) if bookStore is not None and bookIds else {}
+    missingBookIds = [bookId for bookId in bookIds if bookId not in booksById]
+    if booksById:
+        existingBookIds = set(Book.objects.filter(id__in=list(booksById)).values_list('id', flat=True))
+        booksById = {bookId: book for bookId, book in booksById.items() if bookId in existingBookIds}
+    if missingBookIds:
+        booksById.update(Book.objects.only('title', 'thumbnail', 'isbn13').in_bulk(missingBookIds))
+    return [
         {
-            'title': book.title,
-            'thumbnail': book.thumbnail,
-            'url': book.getUrl()
+            'title': booksById[bookId].title,
+            'thumbnail': booksById[bookId].thumbnail,
+            'url': booksById[bookId].getUrl()
         }
-        for book in books
+        for bookId in bookIds if bookId in booksById
     ]
-    cache.set(f'books-based-on-ratings-{request.user.id}', queryset, timeout=30)
-    return queryset
 
 
-def booksBasedOnRating(request):
+def precomputedBookIds(recommender, userId=None, sourceBookId=None):
     """
-        pearson correlation collaborative filtering - Make recommendations based on user ratings.
+    Book ids written by `manage.py build_recommendations`, best first, or None if nothing was precomputed.
     """
-    books = BookSerializerV1(Book.objects.all(), many=True).data
-    ratings = BookReviewSerializerV2(
-        BookReview.objects.all().select_related('book'), many=True, context={'request': request}
-    ).data
-    if books == [] or ratings == []:
-        return []
+    bookIds = list(
+        Recommendation.objects.filter(recommender=recommender, user_id=userId, sourceBook_id=sourceBookId).order_by(
+            'rank'
+        ).values_list('book_id', flat=True)
+    )
+    return bookIds or None
+
+
+def forgetPrecomputedBookIds(recommender, userId):
+    """
+    Drops the user's precomputed rows of recommender after a change they should see, so the live path answers
+    for them until the next `manage.py build_recommendations` run.
+    """
+    Recommendation.objects.filter(recommender=recommender, user_id=userId).delete()
+
+
+def popularBookIds(k=20):
+    return list(BookScore.objects.order_by('-score').values_list('book_id', flat=True)[:k])
+
+
+def popularFallbackIds(k=20):
+    """
+    The precomputed popular list, for recommenders that miss their time budget. Never refits anything.
+    """
+    bookIds = precomputedBookIds(Recommendation.Recommender.BOOKS_BASED_ON_RATINGS)
+    if bookIds is not None:
+        return bookIds[:k]
+    return popularBookIds(k)
+
 
-    booksDataFrame = pandas.DataFrame(books)[['isbn13', 'title']]
-    ratingsDataFrame = pandas.DataFrame(ratings)[['creator', 'isbn13', 'rating']]
-    booksAndRating = pandas.merge(booksDataFrame, ratingsDataFrame)
-    userRatings = booksAndRating.pivot_table(index=['creator'], columns=['title'], values='rating')
+def popularFallbackItems():
+    items = cacheOperations.lastValue('books-based-on-ratings')
+    return items if items is not None else carouselItems(popularFallbackIds())
 
-    # Fixing books that have less than 10 user ratings. Uncomment this in the future
-    # userRatings = userRatings.dropna(thresh=10, axis=1).fillna(0, axis=1)
-    corrMatrix = userRatings.corr(method='pearson')
 
-    def fetchSimilarBooksByTitle(bookName, _rating):
-        similarRatings = corrMatrix[bookName] * (_rating - 2.5)
-        return similarRatings.sort_values(ascending=False)
+def booksBasedOnRatingIds(userId, k=20):
+    # Models are only built offline; until `manage.py build_item_similarity` has run the row is the popular one.
+    if collaborativeOperations.loadItemSimilarityModel() is None:
+        return popularFallbackIds(k)
 
     # Getting user's top-rated books
-    topRatedBookReviews = BookReview.objects.filter(creator=request.user, rating__gte=4).select_related(
-        'book'
-    ).order_by('-rating')[:20]
-    miningBooks = [(review.book.title, 2.0 * review.rating) for review in topRatedBookReviews]
+    topRatedBookReviews = BookReview.objects.filter(creator_id=userId, rating__gte=4).order_by(
+        '-rating'
+    ).values_list('book_id', 'rating')[:20]
+    return collaborativeOperations.itemBasedRecommendations(list(topRatedBookReviews), k)
+
+
+def booksBasedOnRating(request):
+    """
+        item-item collaborative filtering - Make recommendations based on user ratings.
+        Neighbours come from the model built by `manage.py build_item_similarity`.
+        Live results are cached per user, so one that misses the time budget is served to the next request.
+    """
+    userId = request.user.id
+    bookIds = precomputedBookIds(Recommendation.Recommender.BOOKS_BASED_ON_RATING, userId=userId)
+    if bookIds is None:
+        bookIds = cacheOperations.getOrCompute(
+            f'books-based-on-rating-{userId}',
+            lambda: booksBasedOnRatingIds(userId),
+            name='booksBasedOnRating',
+            fallback=popularFallbackIds
+        )
 
-    similarBook = pandas.DataFrame()
-    for book, rating in miningBooks:
-        similarBooksByTitle = fetchSimilarBooksByTitle(book, rating)
-        similarBook = pandas.concat([similarBook, pandas.DataFrame([similarBooksByTitle])], ignore_index=True)
+    if not bookIds:
+        return Book.objects.none()
+    return booksInOrder(bookIds).filter(averageRating__gte=3)
 
-    topRecommendedBooks = similarBook.sum().sort_values(ascending=False).head(20)
-    topBookTitles = [topRecommendedBooks[topRecommendedBooks == i].index[0] for i in topRecommendedBooks]
-    return Book.objects.filter(title__in=topBookTitles, averageRating__gte=3)
+
+def otherUsersFavouriteBookIds(userId, k=20):
+    # The matrix is built by `manage.py build_favourites_matrix` and kept current from the favourites API.
+    favouritesMatrix = collaborativeOperations.getFavouritesMatrix()
+    if favouritesMatrix is None:
+        return popularFallbackIds(k)
+    return favouritesMatrix.recommend(userId, k)
 
 
 def otherUsersFavouriteBooks(request):
     """
     Recommend top 20 books to the current user based on other users with similar favourite books.
-    Uses a sparse user-book matrix and cosine similarity for scalable collaborative filtering.
+    Uses a persisted, incrementally updated sparse user-book matrix and cosine similarity for scalable
+    collaborative filtering.
     Exclude books the user has already favourited. Results are cached for performance.
     """
     if not request.user.is_authenticated:
         return []
 
-    queryset = cache.get(f'other-users-favourite-books-{request.user.id}')
-    if queryset:
-        return queryset
-
-    # Step 1: Get all user-book favourite relationships
-    books = Book.objects.prefetch_related('favouriteRead')
-    users = list(User.objects.values_list('id', flat=True))
-    userIndex = {uid: i for i, uid in enumerate(users)}
-    bookIds = [book.id for book in books]
-    bookIndex = {bid: i for i, bid in enumerate(bookIds)}
-
-    # Step 2: Build sparse user-book matrix
-    row, col = [], []
-    for book in books:
-        for user in book.favouriteRead.all():
-            row.append(userIndex[user.id])
-            col.append(bookIndex[book.id])
-    data = numpy.ones(len(row))
-    userBookMatrix = csr_matrix((data, (row, col)), shape=(len(users), len(bookIds)))
-
-    # Step 3: Compute similarity with current user
-    userVec = userBookMatrix[userIndex[request.user.id]]
-    similarities = cosine_similarity(userVec, userBookMatrix).flatten()
-
-    # Step 4: Score all books by similarity of users who favourited them
-    scores = userBookMatrix.T.dot(similarities)
-
-    # Step 5: Remove books the user already has
-    userBooksMask = userBookMatrix[userIndex[request.user.id]].toarray().flatten()
-    scores[userBooksMask > 0] = 0
-
-    # Step 6: Get top 20 books
-    topIndices = numpy.argpartition(-scores, 20)[:20]
-    topIndices = topIndices[numpy.argsort(-scores[topIndices])]
-
-    recommendedBooks = [books[int(i)] for i in topIndices]
-    queryset = [
-        {
-            'title': book.title,
-            'thumbnail': book.thumbnail,
-            'url': book.getUrl()
-        }
-        for book in recommendedBooks
-    ]
-    cache.set(f'other-users-favourite-books-{request.user.id}', queryset, timeout=30)
-    return queryset
+    userId = request.user.id
+    return cacheOperations.getOrCompute(
+        f'other-users-favourite-books-{userId}',
+        lambda: otherUsersFavouriteBookItems(userId),
+        name='otherUsersFavouriteBooks',
+        fallback=popularFallbackItems
+    )
+
+
+def otherUsersFavouriteBookItems(userId):
+    recommendedBookIds = precomputedBookIds(Recommendation.Recommender.OTHER_USERS_FAVOURITE_BOOKS, userId=userId)
+    if recommendedBookIds is None:
+        recommendedBookIds = otherUsersFavouriteBookIds(userId)
+    return carouselItems(recommendedBookIds)
+
+
+def personalisedBooks(request):
+    """
+    Implicit-feedback matrix factorisation over the user's shelves and book views. Serving is a lookup of the
+    precomputed rows or one dot product against the item factors trained by `manage.py build_implicit_model`.
+    """
+    if not request.user.is_authenticated:
+        return []
+
+    userId = request.user.id
+    return cacheOperations.getOrCompute(
+        f'personalised-books-{userId}',
+        lambda: personalisedBookItems(userId),
+        name='personalisedBooks',
+        fallback=popularFallbackItems
+    )
+
+
+def personalisedBookItems(userId):
+    bookIds = precomputedBookIds(Recommendation.Recommender.PERSONALISED_BOOKS, userId=userId)
+    if bookIds is None:
+        bookIds = factorisationOperations.implicitRecommendations(userId)
+    return carouselItems(bookIds)
+
+
+def similarBookIds(book, k=12):
+    # Prefer the offline index built by `manage.py build_similarity_index`, then one scan of the compact
+    # embeddings from `manage.py build_vector_store`. Books added since either was built fall back to scoring
+    # against the hashed text features, which `manage.py append_text_features` appends new books to.
+    bookIds = similarityOperations.similarBookIds(book.id)
+    if bookIds is not None:
+        return bookIds[:k]
+
+    bookIds = vectorStoreOperations.similarBookIds(book.id, k)
+    if bookIds is not None:
+        return bookIds
+
+    features = textFeatureOperations.loadTextFeatures()
+    if features is None:
+        return []
+
+    row = features.rowsFor([book.id])[0]
+    vector = features.vectors([row]) if row >= 0 else features.transform([book])
+    similarities = features.similarities(vector)[0]
+    if row >= 0:
+        similarities[row] = -numpy.inf
+
+    best = similarityOperations.topIndices(similarities, k)
+    return features.bookIds[best[similarities[best] > -numpy.inf]].tolist()
 
 
 def similarBooks(book):
@@ -408,61 +605,92 @@ def similarBooks(book):
     Content-Based Book Recommendation System:
     Given a Book instance, returns up to 12 similar books based on similarity
     of book descriptions, categories, authors, and publisher.
-    Caches the results for 30 seconds to improve performance.
+    Neighbours are looked up in the precomputed similarity index when the book is in it.
+    Results stay fresh for 30 seconds and are then refreshed in the background while the stale list is served.
     """
-    queryset = cache.get(f'content-based-recommendations-{book.id}')
-    if queryset:
-        return queryset
+    return cacheOperations.getOrCompute(
+        f'content-based-recommendations-{book.id}',
+        lambda: similarBookItems(book),
+        name='similarBooks',
+        fallback=popularFallbackItems
+    )
 
-    allBooks = Book.objects.all()
-    if allBooks.count() == 0:
-        return []
 
-    descriptions = [book.description or "" for book in allBooks]
-    authors = [", ".join(book.authors) if book.authors else "" for book in allBooks]
-    categories = [", ".join(book.categories) if book.categories else "" for book in allBooks]
+def similarBookItems(book):
+    bookIds = precomputedBookIds(Recommendation.Recommender.SIMILAR_BOOKS, sourceBookId=book.id)
+    if bookIds is None:
+        bookIds = similarBookIds(book)
+    return carouselItems(bookIds)
 
-    combinedFeatures = [
-        desc + " " + authors + " " + categories
-        for desc, authors, categories in zip(descriptions, authors, categories)
-    ]
 
-    tfv = TfidfVectorizer(
-        min_df=3,
-        max_features=None,
-        strip_accents='unicode',
-        analyzer='word',
-        token_pattern=r'\w{1,}',
-        ngram_range=(1, 3),
-        stop_words='english'
+def alsoViewedBooks(book):
+    """
+    Books most often viewed in the same session as this one, from the co-occurrence model built by
+    `manage.py build_also_viewed`. Serving is a single row lookup.
+    """
+    return cacheOperations.getOrCompute(
+        f'also-viewed-books-{book.id}', lambda: alsoViewedBookItems(book), name='alsoViewedBooks'
     )
-    tfvMatrix = tfv.fit_transform(combinedFeatures)
 
-    bookDescription = book.description or ""
-    bookAuthors = ", ".join(book.authors) if book.authors else ""
-    bookCategories = ", ".join(book.categories) if book.categories else ""
 
-    bookTransformed = tfv.transform([bookDescription + " " + bookAuthors + " " + bookCategories])
-    similarities = cosine_similarity(bookTransformed, tfvMatrix).flatten()
+def alsoViewedBookItems(book):
+    return carouselItems(alsoViewedOperations.alsoViewedBookIds(book.id))
 
-    similarBooksIndices = similarities.argsort()[-12 - 1:-1][::-1]
-    recommendedBooks = [allBooks[int(i)] for i in similarBooksIndices]
 
-    queryset = [
-        {
-            'title': book.title,
-            'thumbnail': book.thumbnail,
-            'url': book.getUrl()
-        }
-        for book in recommendedBooks
-    ]
-    cache.set(f'content-based-recommendations-{book.id}', queryset, timeout=30)
-    return queryset
+def topRatedBooksByUser(userIds, limit=20):
+    """
+    The (bookId, rating) pairs booksBasedOnRatingIds starts from, for many users in one query.
+    """
+    topRatedBooks = {userId: [] for userId in userIds}
+    reviews = BookReview.objects.filter(creator_id__in=userIds, rating__gte=4).order_by('creator_id', '-rating')
+    for creatorId, bookId, rating in reviews.values_list('creator_id', 'book_id', 'rating').iterator():
+        if len(topRatedBooks[creatorId]) < limit:
+            topRatedBooks[creatorId].append((bookId, rating))
+    return topRatedBooks
+
+
+def batchRecommendationIds(userIds, k=20):
+    """
+    Personalised recommendations for many users at once, for nightly digests and cache warming. Each model
+    scores the whole batch with chunked matrix-matrix products instead of one request at a time.
+    Returns {userId: {recommender: bookIds}}; recommenders whose model has not been built yet give no books.
+    """
+    favouritesMatrix = collaborativeOperations.getFavouritesMatrix()
+
+    byRecommender = {
+        Recommendation.Recommender.BOOKS_BASED_ON_RATING: collaborativeOperations.batchItemBasedRecommendations(
+            topRatedBooksByUser(userIds), k
+        ),
+        Recommendation.Recommender.OTHER_USERS_FAVOURITE_BOOKS: (
+            favouritesMatrix.recommendMany(userIds, k) if favouritesMatrix is not None
+            else {userId: [] for userId in userIds}
+        ),
+        Recommendation.Recommender.PERSONALISED_BOOKS: factorisationOperations.batchImplicitRecommendations(
+            userIds, k
+        ),
+    }
+    return {
+        userId: {recommender: recommendations[userId] for recommender, recommendations in byRecommender.items()}
+        for userId in userIds
+    }
+
+
+def favouriteGenreBookIds(userId, k=100):
+    favouriteGenres = Profile.objects.filter(user_id=userId).values_list('favouriteGenres', flat=True).first()
+    if not favouriteGenres:
+        return []
+    return genreOperations.favouriteGenreBookIds(favouriteGenres, k)
 
 
 def booksBasedOnFavouriteGenres(request):
-    query = Q()
-    for genre in request.user.profile.favouriteGenres:
-        query |= Q(categories__contains=[genre])
-    query &= Q(averageRating__gte=3)
-    return Book.objects.filter(query)
+    """
+    The best rated books across the user's favourite genres, merged from the per-genre lists that
+    `manage.py build_genre_lists` precomputes and ingest keeps current.
+    """
+    bookIds = precomputedBookIds(Recommendation.Recommender.BOOKS_BASED_ON_FAVOURITE_GENRES, userId=request.user.id)
+    if bookIds is None:
+        bookIds = favouriteGenreBookIds(request.user.id)
+
+    if not bookIds:
+        return Book.objects.none()
+    return booksInOrder(bookIds)
@@ -0,0 +1,174 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+SOFT_TIMEOUT = 30
+HARD_TIMEOUT = 60 * 10
+LAST_VALUE_TIMEOUT = 60 * 60 * 24
+LOCK_TIMEOUT = 60
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+BUDGET_WORKERS = 8
+BUDGET_METRIC_KEY = 'recommendation-budget-{name}-{metric}'
+BUDGET_METRICS = ('calls', 'misses')
+
+_budgetPool = ThreadPoolExecutor(max_workers=BUDGET_WORKERS, thread_name_prefix='recommendation-budget')
+
+
+@functools.cache
+def redisClient():
+    """
+    A redis-py client for the default cache's server, for the list and sorted set commands the cache API
+    lacks. Name keys with redisKey so they share the cache's prefix and version.
+    """
+    location = settings.CACHES['default']['LOCATION']
+    if isinstance(location, str):
+        location = location.split(',')
+    return redis.Redis.from_url(location[0])
+
+
+def redisKey(key):
+    return cache.make_and_validate_key(key)
+
+
+def lockKey(key):
+    return f'{key}-refresh-lock'
+
+
+def lastValueKey(key):
+    return f'{key}-last-value'
+
+
+def storeValue(key, value, softTimeout, hardTimeout):
+    # The value is wrapped with its soft expiry, so empty results are cached like any other value.
+    cache.set(key, (value, time.time() + softTimeout), timeout=hardTimeout)
+    cache.set(lastValueKey(key), value, timeout=LAST_VALUE_TIMEOUT)
+    return value
+
+
+def storedEntry(key):
+    """
+    The (value, freshUntil) pair storeValue wrote for key, or None. Anything else under key, such as a bare
+    value cached before entries carried their soft expiry, counts as a miss and is overwritten on the next store.
+    """
+    entry = cache.get(key)
+    if isinstance(entry, tuple) and len(entry) == 2:
+        return entry
+    return None
+
+
+def lastValue(key):
+    """
+    The last value computed for key, kept for a day after it stops being served, or None.
+    """
+    return cache.get(lastValueKey(key))
+
+
+def computeAndStore(key, compute, softTimeout, hardTimeout):
+    try:
+        return storeValue(key, compute(), softTimeout, hardTimeout)
+    finally:
+        cache.delete(lockKey(key))
+
+
+def closingConnections(function):
+    def run():
+        try:
+            return function()
+        finally:
+            # The thread gets its own database connection, which nothing else will close.
+            connections.close_all()
+
+    return run
+
+
+def refreshInBackground(key, compute, softTimeout, hardTimeout):
+    threading.Thread(
+        target=closingConnections(lambda: computeAndStore(key, compute, softTimeout, hardTimeout)), daemon=True
+    ).start()
+
+
+def recordBudget(name, missed):
+    for metric in BUDGET_METRICS if missed else ('calls',):
+        metricKey = BUDGET_METRIC_KEY.format(name=name, metric=metric)
+        cache.add(metricKey, 0, timeout=None)
+        cache.incr(metricKey)
+
+
+def budgetMetrics(name):
+    """
+    {'calls': n, 'misses': n} for a recommender name passed to getOrCompute or runWithinBudget.
+    """
+    values = cache.get_many([BUDGET_METRIC_KEY.format(name=name, metric=metric) for metric in BUDGET_METRICS])
+    return {metric: values.get(BUDGET_METRIC_KEY.format(name=name, metric=metric), 0) for metric in BUDGET_METRICS}
+
+
+def resetBudgetMetrics(name):
+    cache.delete_many([BUDGET_METRIC_KEY.format(name=name, metric=metric) for metric in BUDGET_METRICS])
+
+
+def runWithinBudget(name, compute, fallback, budget=None):
+    """
+    Runs compute on the shared budget pool and waits at most budget seconds (settings.RECOMMENDATION_TIME_BUDGET
+    by default) for it. On a miss the miss is counted and fallback() is returned; compute keeps running, so
+    whatever it stores is there for the next request.
+    """
+    budget = settings.RECOMMENDATION_TIME_BUDGET if budget is None else budget
+    if not budget:
+        return compute()
+
+    future = _budgetPool.submit(closingConnections(compute))
+    try:
+        value = future.result(timeout=budget)
+    except TimeoutError:
+        recordBudget(name, missed=True)
+        return fallback()
+    recordBudget(name, missed=False)
+    return value
+
+
+def getOrCompute(key, compute, softTimeout=SOFT_TIMEOUT, hardTimeout=HARD_TIMEOUT, name=None, fallback=list):
+    """
+    Stale-while-revalidate cache lookup.
+
+    Fresh values are returned as they are. Once a value is older than softTimeout it is still returned
+    until hardTimeout, while a single background thread recomputes it. On a miss only the caller holding
+    the refresh lock runs compute(), within the time budget of runWithinBudget; the others wait for its
+    result for as long. A missed budget serves the last value computed for key, or fallback() if there is
+    none. name groups the budget metrics of keys computed the same way and defaults to key. compute must not
+    depend on the request, because it may run after the response is sent.
+    """
+    entry = storedEntry(key)
+    if entry is not None:
+        value, freshUntil = entry
+        if time.time() >= freshUntil and cache.add(lockKey(key), True, timeout=LOCK_TIMEOUT):
+            refreshInBackground(key, compute, softTimeout, hardTimeout)
+        return value
+
+    def fallbackValue():
+        value = lastValue(key)
+        return fallback() if value is None else value
+
+    name = name or key
+    if cache.add(lockKey(key), True, timeout=LOCK_TIMEOUT):
+        return runWithinBudget(
+            name, lambda: computeAndStore(key, compute, softTimeout, hardTimeout), fallbackValue
+        )
+
+    budget = settings.RECOMMENDATION_TIME_BUDGET
+    deadline = time.time() + (min(budget, WAIT_TIMEOUT) if budget else WAIT_TIMEOUT)
+    while time.time() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = storedEntry(key)
+        if entry is not None:
+            return entry[0]
+    if budget:
+        recordBudget(name, missed=True)
+        return fallbackValue()
+    return compute()
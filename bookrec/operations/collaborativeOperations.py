@@ -0,0 +1,426 @@
+import json
+import threading
+
+import numpy
+import redis
+from scipy import sparse
+
+from bookrec.operations import (
+    artefactOperations,
+    cacheOperations,
+    featureStoreOperations,
+    similarityOperations
+)
+from core.models import (
+    Book,
+    BookReview
+)
+
+ITEM_SIMILARITY_ARTEFACT = 'item-similarity'
+NUMBER_OF_ITEM_NEIGHBOURS = 50
+BUILD_CHUNK_SIZE = 1024
+BATCH_CHUNK_SIZE = 256
+
+FAVOURITES_MATRIX_ARTEFACT = 'favourites-matrix'
+FAVOURITES_DELTA_LOG_KEY = 'favourites-matrix-deltas'
+FAVOURITES_DELTA_OFFSET_KEY = 'favourites-matrix-deltas-offset'
+
+_favouritesMatrix = {
+    'version': None,
+    'matrix': None,
+}
+_favouritesMatrixLock = threading.Lock()
+
+
+def ratingMatrix():
+    """
+    Sparse users x books rating matrix indexed by the sorted user and book ids that have at least one review.
+    """
+    creatorIds, bookIds, ratings = [], [], []
+    for creatorId, bookId, rating in BookReview.objects.values_list('creator_id', 'book_id', 'rating').iterator():
+        creatorIds.append(creatorId)
+        bookIds.append(bookId)
+        ratings.append(rating)
+
+    userIds, userRows = numpy.unique(numpy.array(creatorIds, dtype=numpy.int64), return_inverse=True)
+    itemIds, itemColumns = numpy.unique(numpy.array(bookIds, dtype=numpy.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (numpy.array(ratings, dtype=numpy.float32), (userRows, itemColumns)),
+        shape=(len(userIds), len(itemIds))
+    )
+    return matrix, userIds, itemIds
+
+
+def meanCentredColumns(matrix):
+    """
+    Subtracts each book's mean rating from its stored ratings, leaving unrated cells at zero.
+    """
+    matrix = matrix.tocsc(copy=True)
+    counts = numpy.diff(matrix.indptr)
+    sums = numpy.asarray(matrix.sum(axis=0)).ravel()
+    means = numpy.divide(sums, counts, out=numpy.zeros_like(sums), where=counts > 0)
+    matrix.data -= numpy.repeat(means, counts).astype(matrix.dtype)
+    return matrix
+
+
+def itemNeighbours(centred, numberOfNeighbours, chunkSize=BUILD_CHUNK_SIZE):
+    """
+    Top-k cosine similarity between mean-centred item columns (adjusted Pearson), computed a chunk of items
+    at a time so memory stays at chunkSize x books.
+    """
+    numberOfItems = centred.shape[1]
+    itemsByUsers = centred.T.tocsr()
+    usersByItems = centred.tocsc()
+    norms = numpy.sqrt(numpy.asarray(itemsByUsers.multiply(itemsByUsers).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+
+    neighbours = numpy.full((numberOfItems, numberOfNeighbours), -1, dtype=numpy.int64)
+    similarities = numpy.zeros((numberOfItems, numberOfNeighbours), dtype=numpy.float32)
+
+    for start in range(0, numberOfItems, chunkSize):
+        end = min(start + chunkSize, numberOfItems)
+        products = (itemsByUsers[start:end] @ usersByItems).toarray()
+        products /= norms[start:end, None] * norms[None, :]
+        products[numpy.arange(end - start), numpy.arange(start, end)] = -numpy.inf
+
+        candidates = similarityOperations.topIndicesPerRow(products, numberOfNeighbours)
+        candidateScores = numpy.take_along_axis(products, candidates, axis=1)
+
+        # Only positively correlated books are useful neighbours.
+        neighbours[start:end] = numpy.where(candidateScores > 0, candidates, -1)
+        similarities[start:end] = numpy.where(candidateScores > 0, candidateScores, 0)
+
+    return neighbours, similarities
+
+
+def buildItemSimilarityModel(numberOfNeighbours=NUMBER_OF_ITEM_NEIGHBOURS):
+    """
+    Batch job behind the recommendedBooks shelf: keeps the most similar books (by mean-centred rating
+    similarity) for every reviewed book. Returns the number of books in the model.
+    """
+    matrix, _, itemIds = ratingMatrix()
+    if len(itemIds) < 2:
+        return 0
+
+    neighbours, similarities = itemNeighbours(meanCentredColumns(matrix), min(numberOfNeighbours, len(itemIds) - 1))
+
+    artefactOperations.saveArtefact(
+        ITEM_SIMILARITY_ARTEFACT,
+        {
+            'bookIds': itemIds,
+            'neighbours': numpy.where(neighbours >= 0, itemIds[neighbours], -1),
+            'similarities': similarities
+        }
+    )
+    return len(itemIds)
+
+
+def loadItemSimilarityModel():
+    return artefactOperations.loadArtefact(ITEM_SIMILARITY_ARTEFACT)
+
+
+def itemBasedRecommendations(ratedBooks, k=20):
+    """
+    ratedBooks is a list of (bookId, rating) for the user's top-rated books. Each book's neighbours are
+    weighted by the rating the same way the original pearson recommender did (2 * rating - 2.5) and summed.
+    Returns up to k book ids, best first, excluding the rated books.
+    """
+    model = loadItemSimilarityModel()
+    if model is None or not ratedBooks:
+        return []
+
+    ratedIds = numpy.array([bookId for bookId, _ in ratedBooks], dtype=numpy.int64)
+    weights = numpy.array([2.0 * rating - 2.5 for _, rating in ratedBooks], dtype=numpy.float32)
+
+    positions = featureStoreOperations.artefactRows(model, ratedIds)
+    found = positions >= 0
+    if not found.any():
+        return []
+
+    neighbours = model['neighbours'][positions[found]].ravel()
+    scores = (model['similarities'][positions[found]] * weights[found, None]).ravel()
+    valid = (neighbours >= 0) & ~numpy.isin(neighbours, ratedIds)
+
+    candidateIds, inverse = numpy.unique(neighbours[valid], return_inverse=True)
+    candidateScores = numpy.bincount(inverse, weights=scores[valid], minlength=len(candidateIds))
+    return candidateIds[similarityOperations.topIndices(candidateScores, k)].tolist()
+
+
+def batchItemBasedRecommendations(ratedBooksByUser, k=20):
+    """
+    itemBasedRecommendations for many users at once. ratedBooksByUser maps a user id to its (bookId, rating)
+    list; the weighted neighbour sums for every user are one sparse users x books by books x books product.
+    Returns {userId: bookIds}.
+    """
+    recommendations = {userId: [] for userId in ratedBooksByUser}
+    model = loadItemSimilarityModel()
+    if model is None or not ratedBooksByUser:
+        return recommendations
+
+    numberOfItems = len(model['bookIds'])
+    userIds = list(ratedBooksByUser)
+    userRows, itemColumns, weights = [], [], []
+    for userRow, userId in enumerate(userIds):
+        ratedBooks = ratedBooksByUser[userId]
+        positions = featureStoreOperations.artefactRows(model, [bookId for bookId, _ in ratedBooks])
+        for position, (_, rating) in zip(positions.tolist(), ratedBooks):
+            if position >= 0:
+                userRows.append(userRow)
+                itemColumns.append(position)
+                weights.append(2.0 * rating - 2.5)
+    weightMatrix = sparse.csr_matrix(
+        (numpy.array(weights, dtype=numpy.float32), (userRows, itemColumns)), shape=(len(userIds), numberOfItems)
+    )
+
+    neighbourColumns = featureStoreOperations.artefactRows(model, model['neighbours'].ravel())
+    valid = neighbourColumns >= 0
+    similarityMatrix = sparse.csr_matrix(
+        (
+            model['similarities'].ravel()[valid],
+            (numpy.repeat(numpy.arange(numberOfItems), model['neighbours'].shape[1])[valid], neighbourColumns[valid])
+        ),
+        shape=(numberOfItems, numberOfItems)
+    )
+
+    scores = (weightMatrix @ similarityMatrix).tocsr()
+    scores.sort_indices()
+    for userRow, userId in enumerate(userIds):
+        start, end = scores.indptr[userRow], scores.indptr[userRow + 1]
+        candidates = scores.indices[start:end]
+        candidateScores = scores.data[start:end]
+        ratedColumns = weightMatrix.indices[weightMatrix.indptr[userRow]:weightMatrix.indptr[userRow + 1]]
+        keep = ~numpy.isin(candidates, ratedColumns)
+        candidates, candidateScores = candidates[keep], candidateScores[keep]
+        best = candidates[similarityOperations.topIndices(candidateScores, k)]
+        recommendations[userId] = model['bookIds'][best].tolist()
+    return recommendations
+
+
+class FavouritesMatrix:
+    """
+    Long-lived binary users x books favourites matrix.
+
+    Changes made through the API are appended to a delta log, a Redis list; every worker replays the
+    entries it has not seen yet before serving, so the matrix never has to be rebuilt from the database
+    per request. A delta sets a cell rather than adding to it, which makes replaying idempotent.
+    """
+
+    def __init__(self, matrix, userIds, bookIds, sequence):
+        self.matrix = matrix.tocsr()
+        self.userIds = list(userIds)
+        self.bookIds = list(bookIds)
+        self.userIndex = {userId: row for row, userId in enumerate(self.userIds)}
+        self.bookIndex = {bookId: column for column, bookId in enumerate(self.bookIds)}
+        self.sequence = sequence
+
+    def indexFor(self, index, ids, identifier):
+        if identifier not in index:
+            index[identifier] = len(ids)
+            ids.append(identifier)
+        return index[identifier]
+
+    def applyDeltas(self, deltas):
+        """
+        deltas is an ordered list of (userId, bookId, isFavourite); the last change to a cell wins.
+        """
+        cells = {}
+        for userId, bookId, isFavourite in deltas:
+            row = self.indexFor(self.userIndex, self.userIds, userId)
+            column = self.indexFor(self.bookIndex, self.bookIds, bookId)
+            cells[(row, column)] = 1.0 if isFavourite else 0.0
+        if not cells:
+            return
+
+        shape = (len(self.userIds), len(self.bookIds))
+        if shape != self.matrix.shape:
+            # The loaded matrix is a read-only mapping of the artefact, so grow a private copy.
+            self.matrix = self.matrix.copy()
+            self.matrix.resize(shape)
+
+        rows, columns = (numpy.array(axis, dtype=numpy.int64) for axis in zip(*cells))
+        values = numpy.array(list(cells.values()), dtype=self.matrix.dtype)
+        touched = sparse.csr_matrix((numpy.ones(len(rows), dtype=self.matrix.dtype), (rows, columns)), shape=shape)
+        updated = sparse.csr_matrix((values, (rows, columns)), shape=shape)
+
+        matrix = self.matrix - self.matrix.multiply(touched) + updated
+        matrix.eliminate_zeros()
+        self.matrix = matrix.tocsr()
+
+    def recommend(self, userId, k=20):
+        """
+        Books favourited by users with similar favourites (cosine), excluding the user's own favourites.
+        One sparse row-by-matrix product for the user similarities and one for the book scores.
+        """
+        row = self.userIndex.get(userId)
+        if row is None:
+            return []
+
+        userVector = self.matrix[row]
+        if userVector.nnz == 0:
+            return []
+
+        # Rows are binary, so each row norm is the square root of its number of favourites.
+        rowNorms = numpy.sqrt(numpy.diff(self.matrix.indptr)).astype(numpy.float64)
+        rowNorms[rowNorms == 0] = 1.0
+        similarities = (self.matrix @ userVector.T).toarray().ravel() / (rowNorms * numpy.sqrt(userVector.nnz))
+
+        scores = self.matrix.T @ similarities
+        scores[userVector.indices] = 0
+        best = similarityOperations.topIndices(scores, k)
+        return [self.bookIds[column] for column in best if scores[column] > 0]
+
+    def recommendMany(self, userIds, k=20, chunkSize=BATCH_CHUNK_SIZE):
+        """
+        recommend for many users, chunkSize users at a time: the user similarities and the book scores of a
+        chunk are one sparse matrix-matrix product each. Returns {userId: bookIds}.
+        """
+        recommendations = {userId: [] for userId in userIds}
+        rows = [self.userIndex[userId] for userId in userIds if userId in self.userIndex]
+        rowNorms = numpy.sqrt(numpy.diff(self.matrix.indptr)).astype(numpy.float64)
+        rows = [row for row in rows if rowNorms[row] > 0]
+        rowNorms[rowNorms == 0] = 1.0
+        itemsByUsers = self.matrix.T.tocsr()
+
+        for start in range(0, len(rows), chunkSize):
+            chunkRows = rows[start:start + chunkSize]
+            userVectors = self.matrix[chunkRows]
+            similarities = (userVectors @ itemsByUsers).toarray()
+            similarities /= rowNorms[chunkRows, None] * rowNorms[None, :]
+
+            scores = (itemsByUsers @ similarities.T).T
+            scores[userVectors.nonzero()] = 0
+            best = similarityOperations.topIndicesPerRow(scores, k)
+            for chunkRow, row in enumerate(chunkRows):
+                recommendations[self.userIds[row]] = [
+                    self.bookIds[column] for column in best[chunkRow].tolist() if scores[chunkRow, column] > 0
+                ]
+        return recommendations
+
+
+def buildFavouritesMatrix():
+    """
+    Persists the favourites matrix from the favouriteRead relation. The delta sequence is read before the
+    relation, so replaying later deltas on top of the snapshot converges to the current state.
+    Returns the number of favourites in the matrix.
+    """
+    sequence = deltaSequence()
+    pairs = numpy.array(
+        list(Book.favouriteRead.through.objects.values_list('user_id', 'book_id').iterator()), dtype=numpy.int64
+    ).reshape(-1, 2)
+    userIds, rows = numpy.unique(pairs[:, 0], return_inverse=True)
+    bookIds, columns = numpy.unique(pairs[:, 1], return_inverse=True)
+
+    matrix = sparse.csr_matrix(
+        (numpy.ones(len(pairs), dtype=numpy.float32), (rows, columns)), shape=(len(userIds), len(bookIds))
+    )
+    artefactOperations.saveArtefact(
+        FAVOURITES_MATRIX_ARTEFACT,
+        {'matrix': matrix, 'userIds': userIds, 'bookIds': bookIds},
+        {'sequence': sequence}
+    )
+    trimDeltas(sequence)
+    return len(pairs)
+
+
+def deltaLogKeys():
+    return cacheOperations.redisKey(FAVOURITES_DELTA_LOG_KEY), cacheOperations.redisKey(FAVOURITES_DELTA_OFFSET_KEY)
+
+
+def deltaSequence():
+    """
+    The number of favourite changes ever logged: those trimmed off the front of the log plus those still in it.
+    """
+    logKey, offsetKey = deltaLogKeys()
+    offset, length = cacheOperations.redisClient().pipeline().get(offsetKey).llen(logKey).execute()
+    return int(offset or 0) + length
+
+
+def readDeltas(sequence):
+    """
+    The changes logged after the first sequence ones. The list is read under a WATCH of the trim offset, so a
+    concurrent trim cannot shift it between the two reads. Returns (firstSequence, deltas): firstSequence is
+    larger than sequence when a rebuild has already trimmed some of the changes asked for.
+    """
+    logKey, offsetKey = deltaLogKeys()
+    with cacheOperations.redisClient().pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(offsetKey)
+                offset = int(pipeline.get(offsetKey) or 0)
+                pipeline.multi()
+                pipeline.lrange(logKey, max(sequence - offset, 0), -1)
+                entries = pipeline.execute()[0]
+                break
+            except redis.WatchError:
+                continue
+    return max(sequence, offset), [tuple(json.loads(entry)) for entry in entries]
+
+
+def trimDeltas(sequence):
+    """
+    Drops the first sequence changes, which a matrix built from that sequence already contains.
+    """
+    logKey, offsetKey = deltaLogKeys()
+    with cacheOperations.redisClient().pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(offsetKey)
+                numberOfEntries = sequence - int(pipeline.get(offsetKey) or 0)
+                if numberOfEntries <= 0:
+                    return
+                pipeline.multi()
+                pipeline.ltrim(logKey, numberOfEntries, -1)
+                pipeline.incrby(offsetKey, numberOfEntries)
+                pipeline.execute()
+                return
+            except redis.WatchError:
+                continue
+
+
+def recordFavouriteChange(userId, bookId, isFavourite):
+    """
+    Appends a favouriteRead change to the delta log replayed by getFavouritesMatrix. RPUSH is atomic, so a
+    change's position in the log is its sequence and no reader can see a gap.
+    """
+    logKey, _ = deltaLogKeys()
+    cacheOperations.redisClient().rpush(logKey, json.dumps([userId, bookId, isFavourite]))
+
+
+def loadFavouritesMatrix():
+    """
+    Wraps the shared matrix artefact; deltas applied on top of it stay private to this worker until the
+    next rebuild publishes a new version.
+    """
+    artefact = artefactOperations.loadArtefact(FAVOURITES_MATRIX_ARTEFACT)
+    if artefact is None:
+        return None
+
+    if _favouritesMatrix['version'] != artefact.version:
+        _favouritesMatrix['matrix'] = FavouritesMatrix(
+            artefact['matrix'], artefact['userIds'].tolist(), artefact['bookIds'].tolist(),
+            artefact.metadata['sequence']
+        )
+        _favouritesMatrix['version'] = artefact.version
+    return _favouritesMatrix['matrix']
+
+
+def getFavouritesMatrix():
+    """
+    This worker's favourites matrix with every logged change applied, or None if it has not been built yet.
+    """
+    with _favouritesMatrixLock:
+        favouritesMatrix = loadFavouritesMatrix()
+        if favouritesMatrix is None:
+            return None
+
+        firstSequence, deltas = readDeltas(favouritesMatrix.sequence)
+        if firstSequence > favouritesMatrix.sequence:
+            # A rebuild trimmed changes this matrix has not seen; the version it published contains them.
+            rebuiltMatrix = loadFavouritesMatrix()
+            if rebuiltMatrix is not favouritesMatrix:
+                favouritesMatrix = rebuiltMatrix
+                firstSequence, deltas = readDeltas(favouritesMatrix.sequence)
+
+        favouritesMatrix.applyDeltas(deltas)
+        favouritesMatrix.sequence = firstSequence + len(deltas)
+        return favouritesMatrix
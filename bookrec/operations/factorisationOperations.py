@@ -0,0 +1,168 @@
+import numpy
+from scipy import sparse
+
+from bookrec.operations import (
+    artefactOperations,
+    featureStoreOperations,
+    similarityOperations
+)
+from core.models import (
+    Book,
+    UserActivityLog
+)
+
+IMPLICIT_FACTORS_ARTEFACT = 'implicit-factors'
+NUMBER_OF_FACTORS = 64
+NUMBER_OF_ITERATIONS = 15
+REGULARISATION = 0.1
+CONFIDENCE_SCALE = 40.0
+BATCH_CHUNK_SIZE = 1024
+
+# How strongly each shelf says "this user likes this book"; views add a little each time.
+SHELF_WEIGHTS = {
+    'favouriteRead': 4.0,
+    'haveRead': 3.0,
+    'readingNow': 2.0,
+    'toRead': 1.0,
+}
+VIEW_WEIGHT = 0.5
+
+
+def interactionMatrix():
+    """
+    Sparse users x books matrix of summed shelf and VIEW_BOOK weights, indexed by the sorted user and book
+    ids that have at least one interaction.
+    """
+    userIds, bookIds, weights = [], [], []
+    for field, weight in SHELF_WEIGHTS.items():
+        for userId, bookId in getattr(Book, field).through.objects.values_list('user_id', 'book_id').iterator():
+            userIds.append(userId)
+            bookIds.append(bookId)
+            weights.append(weight)
+
+    bookIdByIsbn13 = dict(Book.objects.values_list('isbn13', 'id').iterator())
+    views = UserActivityLog.objects.filter(action=UserActivityLog.Action.VIEW_BOOK)
+    for userId, data in views.values_list('user_id', 'data').iterator():
+        bookId = bookIdByIsbn13.get((data or {}).get('book-isbn13'))
+        if bookId is not None:
+            userIds.append(userId)
+            bookIds.append(bookId)
+            weights.append(VIEW_WEIGHT)
+
+    uniqueUserIds, rows = numpy.unique(numpy.array(userIds, dtype=numpy.int64), return_inverse=True)
+    uniqueBookIds, columns = numpy.unique(numpy.array(bookIds, dtype=numpy.int64), return_inverse=True)
+    # Duplicate (user, book) entries are summed by the conversion to CSR.
+    matrix = sparse.coo_matrix(
+        (numpy.array(weights, dtype=numpy.float32), (rows, columns)), shape=(len(uniqueUserIds), len(uniqueBookIds))
+    ).tocsr()
+    return matrix, uniqueUserIds, uniqueBookIds
+
+
+def leastSquaresStep(confidence, fixed, regularisation):
+    """
+    Solves every row's factors with the other side held fixed (Hu, Koren & Volinsky 2008). confidence holds
+    c - 1 for observed cells, so each row only touches its own non-zeros on top of the shared Gram matrix.
+    """
+    numberOfFactors = fixed.shape[1]
+    gram = fixed.T @ fixed + regularisation * numpy.eye(numberOfFactors)
+    solved = numpy.zeros((confidence.shape[0], numberOfFactors), dtype=numpy.float64)
+
+    for row in range(confidence.shape[0]):
+        start, end = confidence.indptr[row], confidence.indptr[row + 1]
+        if start == end:
+            continue
+        observed = fixed[confidence.indices[start:end]]
+        extraConfidence = confidence.data[start:end]
+        solved[row] = numpy.linalg.solve(
+            gram + (observed.T * extraConfidence) @ observed, observed.T @ (extraConfidence + 1.0)
+        )
+    return solved
+
+
+def alternatingLeastSquares(confidence, numberOfFactors=NUMBER_OF_FACTORS, iterations=NUMBER_OF_ITERATIONS,
+                            regularisation=REGULARISATION, seed=0):
+    randomState = numpy.random.default_rng(seed)
+    itemFactors = randomState.normal(scale=0.01, size=(confidence.shape[1], numberOfFactors))
+    userFactors = numpy.zeros((confidence.shape[0], numberOfFactors))
+    itemsByUsers = confidence.T.tocsr()
+
+    for _ in range(iterations):
+        userFactors = leastSquaresStep(confidence, itemFactors, regularisation)
+        itemFactors = leastSquaresStep(itemsByUsers, userFactors, regularisation)
+    return userFactors.astype(numpy.float32), itemFactors.astype(numpy.float32)
+
+
+def buildImplicitModel(numberOfFactors=NUMBER_OF_FACTORS, iterations=NUMBER_OF_ITERATIONS,
+                       regularisation=REGULARISATION):
+    """
+    Batch job behind the personalised books row: factorises the shelf and viewing signal and persists the
+    user and book factors. Returns the number of interactions the model was trained on.
+    """
+    matrix, userIds, bookIds = interactionMatrix()
+    if matrix.nnz == 0:
+        return 0
+
+    confidence = matrix.copy()
+    confidence.data = (CONFIDENCE_SCALE * numpy.log1p(confidence.data)).astype(numpy.float64)
+    userFactors, itemFactors = alternatingLeastSquares(confidence, numberOfFactors, iterations, regularisation)
+
+    artefactOperations.saveArtefact(
+        IMPLICIT_FACTORS_ARTEFACT,
+        {
+            'userIds': userIds,
+            'bookIds': bookIds,
+            'userFactors': userFactors,
+            'itemFactors': itemFactors,
+            'interactions': matrix,
+        }
+    )
+    return matrix.nnz
+
+
+def loadImplicitModel():
+    return artefactOperations.loadArtefact(IMPLICIT_FACTORS_ARTEFACT)
+
+
+def implicitRecommendations(userId, k=20):
+    """
+    Top-k books by predicted preference, excluding books the user already has a shelf or view signal for.
+    One item factors x user vector product plus a partial sort.
+    """
+    model = loadImplicitModel()
+    if model is None:
+        return []
+
+    position = featureStoreOperations.artefactRows(model, [userId], key='userIds')[0]
+    if position < 0:
+        return []
+
+    scores = model['itemFactors'] @ model['userFactors'][position]
+    scores[model['interactions'][position].indices] = -numpy.inf
+    best = similarityOperations.topIndices(scores, k)
+    return model['bookIds'][best[scores[best] > -numpy.inf]].tolist()
+
+
+def batchImplicitRecommendations(userIds, k=20, chunkSize=BATCH_CHUNK_SIZE):
+    """
+    implicitRecommendations for many users at once: the scores of a chunk of users are one dense
+    user factors x item factors product. Returns {userId: bookIds}.
+    """
+    recommendations = {userId: [] for userId in userIds}
+    model = loadImplicitModel()
+    if model is None:
+        return recommendations
+
+    rows = featureStoreOperations.artefactRows(model, userIds, key='userIds')
+    knownUserIds = [userId for userId, row in zip(userIds, rows.tolist()) if row >= 0]
+    knownRows = rows[rows >= 0]
+    itemFactorsTransposed = numpy.ascontiguousarray(model['itemFactors'].T)
+
+    for start in range(0, len(knownRows), chunkSize):
+        chunkRows = knownRows[start:start + chunkSize]
+        scores = model['userFactors'][chunkRows] @ itemFactorsTransposed
+        scores[model['interactions'][chunkRows].nonzero()] = -numpy.inf
+        best = similarityOperations.topIndicesPerRow(scores, k)
+        for chunkRow, userId in enumerate(knownUserIds[start:start + chunkSize]):
+            keep = best[chunkRow][scores[chunkRow, best[chunkRow]] > -numpy.inf]
+            recommendations[userId] = model['bookIds'][keep].tolist()
+    return recommendations
@@ -0,0 +1,167 @@
+import threading
+
+import numpy
+from django.urls import reverse
+
+from bookrec.operations import artefactOperations
+from core.models import Book
+
+BOOK_STORE_ARTEFACT = 'book-store'
+READ_CHUNK_SIZE = 2000
+STRING_FIELDS = ('title', 'thumbnail', 'isbn13')
+
+_bookStore = {
+    'version': None,
+    'store': None,
+}
+_rowIndexes = {}
+_storeLock = threading.Lock()
+
+
+def denseIndex(ids):
+    """
+    Dense id -> row array (-1 where there is no row), so looking up a batch of ids is one fancy-indexing op.
+    Ids are database primary keys, so the array is about as long as the table.
+    """
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    index = numpy.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=numpy.int32)
+    index[ids] = numpy.arange(len(ids), dtype=numpy.int32)
+    return index
+
+
+def lookupRows(index, ids):
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    rows = numpy.full(len(ids), -1, dtype=numpy.int64)
+    inRange = (ids >= 0) & (ids < len(index))
+    rows[inRange] = index[ids[inRange]]
+    return rows
+
+
+def artefactRows(artefact, ids, key='bookIds'):
+    """
+    Rows of ids in the id array an artefact stores under key, -1 for ids it does not contain. The dense index
+    is built once per artefact version and shared by every recommender in the worker.
+    """
+    with _storeLock:
+        cached = _rowIndexes.get((artefact.name, key))
+        if cached is None or cached[0] != artefact.version:
+            cached = (artefact.version, denseIndex(artefact[key]))
+            _rowIndexes[(artefact.name, key)] = cached
+    return lookupRows(cached[1], ids)
+
+
+def encodeStrings(values):
+    """
+    Packs strings into one utf-8 byte array plus offsets, which maps read-only like any other column.
+    """
+    encoded = [(value or '').encode('utf-8') for value in values]
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum([len(value) for value in encoded], dtype=numpy.int64)
+    return numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8), offsets
+
+
+class StringColumn:
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+
+class BookRecord:
+    """
+    The handful of Book fields the carousels render, without a model instance or a query.
+    """
+    __slots__ = ('id', 'title', 'thumbnail', 'isbn13', 'averageRating', 'ratingsCount')
+
+    def __init__(self, id, title, thumbnail, isbn13, averageRating, ratingsCount):
+        self.id = id
+        self.title = title
+        self.thumbnail = thumbnail
+        self.isbn13 = isbn13
+        self.averageRating = averageRating
+        self.ratingsCount = ratingsCount
+
+    def getUrl(self):
+        return reverse('core:book-detail-view', kwargs={'isbn13': self.isbn13})
+
+
+class BookStore:
+    """
+    Column-oriented book metadata keyed by Book.id, memory-mapped from the book store artefact.
+    """
+
+    def __init__(self, artefact):
+        self.artefact = artefact
+        self.bookIds = artefact['bookIds']
+        self.averageRatings = artefact['averageRating']
+        self.ratingsCounts = artefact['ratingsCount']
+        self.strings = {
+            field: StringColumn(artefact[f'{field}Data'], artefact[f'{field}Offsets']) for field in STRING_FIELDS
+        }
+
+    def rowsFor(self, bookIds):
+        return artefactRows(self.artefact, bookIds)
+
+    def record(self, row):
+        return BookRecord(
+            int(self.bookIds[row]),
+            self.strings['title'][row],
+            self.strings['thumbnail'][row],
+            self.strings['isbn13'][row],
+            float(self.averageRatings[row]),
+            int(self.ratingsCounts[row])
+        )
+
+    def records(self, bookIds):
+        """
+        BookRecords by id for the given ids that are in the store.
+        """
+        return {
+            bookId: self.record(row) for bookId, row in zip(bookIds, self.rowsFor(bookIds).tolist()) if row >= 0
+        }
+
+
+def buildBookStore():
+    """
+    Snapshots the carousel fields of every book, reading READ_CHUNK_SIZE rows at a time.
+    Returns the number of books stored.
+    """
+    rows = Book.objects.order_by('id').values_list(
+        'id', 'averageRating', 'ratingsCount', *STRING_FIELDS
+    ).iterator(chunk_size=READ_CHUNK_SIZE)
+
+    bookIds, averageRatings, ratingsCounts = [], [], []
+    strings = {field: [] for field in STRING_FIELDS}
+    for bookId, averageRating, ratingsCount, *values in rows:
+        bookIds.append(bookId)
+        averageRatings.append(float(averageRating or 0))
+        ratingsCounts.append(ratingsCount or 0)
+        for field, value in zip(STRING_FIELDS, values):
+            strings[field].append(value)
+
+    arrays = {
+        'bookIds': numpy.array(bookIds, dtype=numpy.int64),
+        'averageRating': numpy.array(averageRatings, dtype=numpy.float32),
+        'ratingsCount': numpy.array(ratingsCounts, dtype=numpy.int32),
+    }
+    for field, values in strings.items():
+        arrays[f'{field}Data'], arrays[f'{field}Offsets'] = encodeStrings(values)
+
+    artefactOperations.saveArtefact(BOOK_STORE_ARTEFACT, arrays)
+    return len(bookIds)
+
+
+def loadBookStore():
+    artefact = artefactOperations.loadArtefact(BOOK_STORE_ARTEFACT)
+    if artefact is None:
+        return None
+
+    with _storeLock:
+        if _bookStore['version'] != artefact.version:
+            _bookStore['store'] = BookStore(artefact)
+            _bookStore['version'] = artefact.version
+        return _bookStore['store']
@@ -0,0 +1,113 @@
+import heapq
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+
+from core.models import (
+    Book,
+    GenreTopBook
+)
+
+GENRE_LIST_SIZE = 100
+MINIMUM_AVERAGE_RATING = Decimal(3)
+READ_CHUNK_SIZE = 5000
+
+
+def rankKey(entry):
+    # Same order as the old favourite genres query: highest rated first, ties by id.
+    averageRating, bookId = entry
+    return -averageRating, bookId
+
+
+def topBooksByGenre(books, size=GENRE_LIST_SIZE):
+    """
+    books is an iterable of (bookId, categories, averageRating). Returns {genre: [(averageRating, bookId)]}
+    with the size best books of every genre, keeping one bounded heap per genre.
+    """
+    heaps = defaultdict(list)
+    for bookId, categories, averageRating in books:
+        if averageRating < MINIMUM_AVERAGE_RATING:
+            continue
+        for genre in set(categories or []):
+            # Heap of (averageRating, -bookId) pops the worst book of the list first.
+            entry = (averageRating, -bookId)
+            if len(heaps[genre]) < size:
+                heapq.heappush(heaps[genre], entry)
+            elif entry > heaps[genre][0]:
+                heapq.heapreplace(heaps[genre], entry)
+    return {
+        genre: sorted(((averageRating, -negativeId) for averageRating, negativeId in heap), key=rankKey)
+        for genre, heap in heaps.items()
+    }
+
+
+def genreTopBookRows(topBooks):
+    return [
+        GenreTopBook(genre=genre, book_id=bookId, averageRating=averageRating)
+        for genre, entries in topBooks.items() for averageRating, bookId in entries
+    ]
+
+
+def buildGenreTopBooks(size=GENRE_LIST_SIZE):
+    """
+    Rebuilds every genre's list from one pass over the catalogue. Ratings change as reviews come in, so run it
+    on a schedule; ingest only merges new books in. Returns the number of genres.
+    """
+    books = Book.objects.values_list('id', 'categories', 'averageRating').iterator(chunk_size=READ_CHUNK_SIZE)
+    topBooks = topBooksByGenre(books, size)
+
+    with transaction.atomic():
+        GenreTopBook.objects.all().delete()
+        GenreTopBook.objects.bulk_create(genreTopBookRows(topBooks), batch_size=5000)
+    return len(topBooks)
+
+
+def addBooks(bookIds, size=GENRE_LIST_SIZE):
+    """
+    Merges newly ingested books into the lists of their genres, reading only those genres' current entries.
+    """
+    newBooks = list(Book.objects.filter(id__in=bookIds).values_list('id', 'categories', 'averageRating'))
+    genres = {genre for _, categories, _ in newBooks for genre in categories or []}
+    if not genres:
+        return
+
+    currentBooks = defaultdict(list)
+    for genre, bookId, averageRating in GenreTopBook.objects.filter(genre__in=genres).values_list(
+        'genre', 'book_id', 'averageRating'
+    ):
+        currentBooks[bookId].append((genre, averageRating))
+
+    # Existing entries keep the rating they were listed with until the next full rebuild.
+    candidates = [(bookId, [genre], averageRating) for bookId, entries in currentBooks.items()
+                  for genre, averageRating in entries]
+    candidates += [(bookId, [genre for genre in categories or [] if genre in genres], averageRating)
+                   for bookId, categories, averageRating in newBooks]
+    topBooks = topBooksByGenre(candidates, size)
+
+    with transaction.atomic():
+        GenreTopBook.objects.filter(genre__in=genres).delete()
+        GenreTopBook.objects.bulk_create(genreTopBookRows(topBooks), ignore_conflicts=True)
+
+
+def favouriteGenreBookIds(favouriteGenres, k=GENRE_LIST_SIZE):
+    """
+    k-way merge of the precomputed lists of the given genres: best rated first, each book once, without
+    touching the catalogue. Reads at most len(favouriteGenres) x GENRE_LIST_SIZE rows.
+    """
+    if not favouriteGenres:
+        return []
+
+    lists = defaultdict(list)
+    for genre, bookId, averageRating in GenreTopBook.objects.filter(genre__in=favouriteGenres).order_by(
+        'genre', '-averageRating', 'book_id'
+    ).values_list('genre', 'book_id', 'averageRating'):
+        lists[genre].append((averageRating, bookId))
+
+    seen = set()
+    merged = (
+        bookId for _, bookId in heapq.merge(*lists.values(), key=rankKey)
+        if not (bookId in seen or seen.add(bookId))
+    )
+    return list(islice(merged, k))
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+DETAIL_WORKERS = 8
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 5
+DETAILS_TIMEOUT = 10
+
+
+class ResponseCache:
+    """
+    Thread-safe in-process cache of response bodies bounded by their total size in bytes. Entries expire
+    after their own ttl; when the bound is reached the least recently used entries are evicted first.
+    """
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expiresAt, body = entry
+            if time.time() >= expiresAt:
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return body
+
+    def set(self, key, body, ttl):
+        if len(body) > self.maxBytes:
+            return
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (time.time() + ttl, body)
+            self.size += len(body)
+            while self.size > self.maxBytes:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+# One keep-alive session for every call, with a connection per detail worker so the pool never has to wait.
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_maxsize=DETAIL_WORKERS))
+_session.mount('https://', HTTPAdapter(pool_maxsize=DETAIL_WORKERS))
+_detailPool = ThreadPoolExecutor(max_workers=DETAIL_WORKERS, thread_name_prefix='google-books')
+_responseCache = ResponseCache(settings.GOOGLE_BOOKS_CACHE_MAX_BYTES)
+
+
+def emptyVolume():
+    return {'volumeInfo': {}}
+
+
+def normaliseQuery(query):
+    return ' '.join(query.casefold().split())
+
+
+def volumeId(selfLink):
+    return selfLink.rstrip('/').rsplit('/', 1)[-1]
+
+
+def hasNoResults(data):
+    return data.get('totalItems') == 0 or not data.get('items')
+
+
+def getBody(url, params=None):
+    """
+    GET url on the shared session. Returns the raw body, or None if the call failed or timed out.
+    """
+    try:
+        response = _session.get(url, params=params, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        response.raise_for_status()
+        return response.content
+    except requests.RequestException:
+        return None
+
+
+def getJson(cacheKey, url, params=None, isNegative=None):
+    """
+    The decoded JSON response for url, from the response cache when it holds cacheKey. Successful responses
+    are cached for GOOGLE_BOOKS_CACHE_TTL seconds, or GOOGLE_BOOKS_NEGATIVE_CACHE_TTL when isNegative(data)
+    says they hold no results. Failures are never cached. None if the call failed or was not JSON.
+    """
+    body = _responseCache.get(cacheKey)
+    cached = body is not None
+    if not cached:
+        body = getBody(url, params)
+        if body is None:
+            return None
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+
+    if not cached and isinstance(data, dict):
+        negative = isNegative is not None and isNegative(data)
+        ttl = settings.GOOGLE_BOOKS_NEGATIVE_CACHE_TTL if negative else settings.GOOGLE_BOOKS_CACHE_TTL
+        _responseCache.set(cacheKey, body, ttl)
+    return data
+
+
+def searchVolumes(query):
+    """
+    The items of a volumes search, or an empty list if Google had no results or could not be reached.
+    Identical queries, ignoring case and spacing, are answered from the response cache.
+    """
+    data = getJson(
+        f'search:{normaliseQuery(query)}',
+        f'{settings.GOOGLE_BOOKS_API_URL}/volumes',
+        params={'q': query},
+        isNegative=hasNoResults
+    )
+    return (data or {}).get('items') or []
+
+
+def fetchVolume(selfLink):
+    return getJson(f'volume:{volumeId(selfLink)}', selfLink)
+
+
+def fetchVolumeDetails(selfLinks):
+    """
+    Fetches the detail document of every selfLink concurrently on DETAIL_WORKERS threads, waiting at most
+    DETAILS_TIMEOUT seconds overall. Returns {selfLink: volume}; calls that failed or did not finish in time
+    map to an empty volume, so callers fall back to the search result's own fields.
+    """
+    futures = {selfLink: _detailPool.submit(fetchVolume, selfLink) for selfLink in set(selfLinks) if selfLink}
+    wait(futures.values(), timeout=DETAILS_TIMEOUT)
+
+    details = {}
+    for selfLink, future in futures.items():
+        volume = future.result() if future.done() else None
+        if not future.done():
+            future.cancel()
+        details[selfLink] = volume if isinstance(volume, dict) and volume.get('volumeInfo') else emptyVolume()
+    return details
@@ -2,6 +2,7 @@ from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 
+from bookrec.operations import trendingOperations
 from core.models import UserActivityLog
 
 CACHE_KEY = 'UserActivityLog'
@@ -22,6 +23,8 @@ def log(request, action, data=None):
         )
     )
 
+    trendingOperations.recordEvent(action, data)
+
     if len(logs) >= CACHE_BATCH_SIZE:
         with transaction.atomic():
             UserActivityLog.objects.bulk_create(logs)
@@ -0,0 +1,105 @@
+import numpy
+
+from bookrec.operations import (
+    artefactOperations,
+    featureStoreOperations,
+    textFeatureOperations
+)
+
+SIMILARITY_INDEX_ARTEFACT = 'similarity-index'
+NUMBER_OF_NEIGHBOURS = 12
+BUILD_CHUNK_SIZE = 1024
+
+
+def topNeighbours(tfvMatrix, numberOfNeighbours, chunkSize=BUILD_CHUNK_SIZE):
+    """
+    Rows of the TF-IDF matrix are l2-normalised, so the sparse dot product is the cosine similarity.
+    Similarities are computed one chunk of rows at a time to keep memory at chunkSize x N.
+    """
+    numberOfBooks = tfvMatrix.shape[0]
+    neighbours = numpy.empty((numberOfBooks, numberOfNeighbours), dtype=numpy.int64)
+    matrixTransposed = tfvMatrix.T.tocsc()
+
+    for start in range(0, numberOfBooks, chunkSize):
+        end = min(start + chunkSize, numberOfBooks)
+        similarities = (tfvMatrix[start:end] @ matrixTransposed).toarray()
+        similarities[numpy.arange(end - start), numpy.arange(start, end)] = -numpy.inf
+        neighbours[start:end] = topIndicesPerRow(similarities, numberOfNeighbours)
+
+    return neighbours
+
+
+def topIndices(scores, k):
+    """
+    Indices of the k highest scores, best first, using a partial sort.
+    """
+    if k >= len(scores):
+        return numpy.argsort(-scores, kind='stable')
+
+    candidates = numpy.argpartition(-scores, k - 1)[:k]
+    return candidates[numpy.argsort(-scores[candidates], kind='stable')]
+
+
+def topIndicesPerRow(scores, k):
+    """
+    Column indices of the k highest scores in every row of a dense matrix, best first.
+    """
+    if k >= scores.shape[1]:
+        return numpy.argsort(-scores, axis=1, kind='stable')
+
+    candidates = numpy.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = numpy.argsort(-numpy.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return numpy.take_along_axis(candidates, order, axis=1)
+
+
+def buildSimilarityIndex(numberOfNeighbours=NUMBER_OF_NEIGHBOURS, findNeighbours=topNeighbours):
+    """
+    Rehashes the catalogue's text features and persists the top-k most similar book ids for each book,
+    so similarBooks only has to do a lookup.
+    findNeighbours(tfvMatrix, k) returns the neighbour rows; annOperations.buildApproximateSimilarityIndex
+    finds them with the LSH index instead, on catalogues too large for the exact scan. Returns the number of
+    books indexed.
+    """
+    textFeatureOperations.buildTextFeatures()
+    features = textFeatureOperations.loadTextFeatures()
+    if features is None:
+        return 0
+    return saveSimilarityIndex(features.bookIds, features.matrix(), numberOfNeighbours, findNeighbours)
+
+
+def saveSimilarityIndex(bookIds, tfvMatrix, numberOfNeighbours, findNeighbours):
+    """
+    Persists the neighbours findNeighbours finds among the rows of tfvMatrix, which belong to bookIds.
+    Returns the number of books indexed.
+    """
+    numberOfNeighbours = min(numberOfNeighbours, len(bookIds) - 1)
+    if numberOfNeighbours < 1:
+        return 0
+
+    neighbourRows = findNeighbours(tfvMatrix, numberOfNeighbours)
+    artefactOperations.saveArtefact(
+        SIMILARITY_INDEX_ARTEFACT,
+        {'bookIds': bookIds, 'neighbours': numpy.where(neighbourRows >= 0, bookIds[neighbourRows], -1)}
+    )
+    return len(bookIds)
+
+
+def loadSimilarityIndex():
+    """
+    The index shared read-only by every worker; a rebuild is picked up on the next call.
+    """
+    return artefactOperations.loadArtefact(SIMILARITY_INDEX_ARTEFACT)
+
+
+def similarBookIds(bookId):
+    """
+    Returns the precomputed most similar book ids for bookId, or None if the book is not in the index yet.
+    """
+    index = loadSimilarityIndex()
+    if index is None:
+        return None
+
+    row = featureStoreOperations.artefactRows(index, [bookId])[0]
+    if row < 0:
+        return None
+    return [neighbour for neighbour in index['neighbours'][row].tolist() if neighbour >= 0]
@@ -0,0 +1,159 @@
+import math
+from itertools import groupby
+from operator import itemgetter
+
+import numpy
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from bookrec.operations import (
+    similarityOperations,
+    textFeatureOperations
+)
+from core.models import (
+    Book,
+    TasteVector,
+    UserActivityLog
+)
+
+HALF_LIFE = 60 * 60 * 24 * 30
+DECAY_RATE = math.log(2) / HALF_LIFE
+MAXIMUM_TERMS = 1000
+HIGH_RATING = 4
+APPLIED_LOG_ID_KEY = 'taste-vectors-applied-log-id'
+
+ACTION_WEIGHTS = {
+    UserActivityLog.Action.VIEW_BOOK: 1.0,
+    UserActivityLog.Action.ADD_TO_FAVOURITES: 3.0,
+}
+RATING_ACTIONS = (UserActivityLog.Action.ADD_COMMENT, UserActivityLog.Action.EDIT_COMMENT)
+
+
+def eventWeight(action, data):
+    """
+    How much a logged action pulls the taste vector towards its book: views and favourites have fixed weights,
+    reviews count only when the rating is high. 0 for actions that say nothing about taste.
+    """
+    if action in RATING_ACTIONS:
+        rating = (data or {}).get('rating')
+        return float(rating - HIGH_RATING + 1) if rating is not None and rating >= HIGH_RATING else 0.0
+    return ACTION_WEIGHTS.get(action, 0.0)
+
+
+def bookVector(features, bookId):
+    row = features.rowsFor([bookId])[0]
+    if row >= 0:
+        return features.vectors([row])
+    return features.transform(Book.objects.filter(id=bookId))
+
+
+def sparseTaste(indices, weights, scale=1.0):
+    return sparse.csr_matrix(
+        (
+            numpy.array(weights, dtype=numpy.float64) * scale,
+            numpy.array(indices, dtype=numpy.int64),
+            [0, len(indices)]
+        ),
+        shape=(1, textFeatureOperations.NUMBER_OF_FEATURES)
+    )
+
+
+def updatedTaste(indices, weights, updatedAt, vector, weight, timestamp):
+    """
+    Decays the stored sparse taste to timestamp, adds weight * vector and keeps the MAXIMUM_TERMS largest
+    terms. Returns the new (indices, weights).
+    """
+    decay = math.exp(-DECAY_RATE * max((timestamp - updatedAt).total_seconds(), 0.0))
+    taste = (sparseTaste(indices, weights, decay) + vector * weight).tocsr()
+    taste.eliminate_zeros()
+
+    keep = numpy.sort(similarityOperations.topIndices(taste.data, MAXIMUM_TERMS))
+    return taste.indices[keep].tolist(), taste.data[keep].tolist()
+
+
+def applyEvents(features, userId, events):
+    """
+    Folds one user's logged events, (logId, action, data, timeStamp) in id order, into their persisted taste
+    vector. Events at or below the vector's lastLogId were already applied and are skipped, so overlapping
+    runs, or a run after the APPLIED_LOG_ID_KEY mark was lost, never count an event twice. Returns the number of events that changed the vector.
+    """
+    isbn13s = {(data or {}).get('book-isbn13') for _, _, data, _ in events}
+    bookIdsByIsbn13 = dict(Book.objects.filter(isbn13__in=isbn13s).values_list('isbn13', 'id'))
+
+    applied = 0
+    with transaction.atomic():
+        tasteVector, _ = TasteVector.objects.select_for_update().get_or_create(
+            user_id=userId, defaults={'updatedDateTime': events[0][3]}
+        )
+        indices, weights, updatedAt = tasteVector.indices, tasteVector.weights, tasteVector.updatedDateTime
+        for logId, action, data, timeStamp in events:
+            weight = eventWeight(action, data)
+            bookId = bookIdsByIsbn13.get((data or {}).get('book-isbn13'))
+            if logId <= tasteVector.lastLogId or weight <= 0 or bookId is None:
+                continue
+
+            indices, weights = updatedTaste(
+                indices, weights, updatedAt, bookVector(features, bookId), weight, timeStamp
+            )
+            updatedAt = max(updatedAt, timeStamp)
+            applied += 1
+
+        tasteVector.indices, tasteVector.weights, tasteVector.updatedDateTime = indices, weights, updatedAt
+        tasteVector.lastLogId = max(tasteVector.lastLogId, events[-1][0])
+        tasteVector.save(update_fields=['indices', 'weights', 'updatedDateTime', 'lastLogId'])
+    return applied
+
+
+def lastLogId():
+    return UserActivityLog.objects.aggregate(lastLogId=Max('id'))['lastLogId'] or 0
+
+
+def markLogsApplied(logId):
+    cache.set(APPLIED_LOG_ID_KEY, logId, timeout=None)
+
+
+def applyLoggedEvents():
+    """
+    Folds the activity logged since the last run into the users' taste vectors. One high-water log id marks
+    where the last run stopped, so each run reads only the new rows through the primary key. Run by
+    `manage.py update_taste_vectors`, never from a request: the log is written in batches, so taste vectors
+    trail the activity by one log batch and one run. Returns the number of events applied.
+    """
+    features = textFeatureOperations.loadTextFeatures()
+    if features is None:
+        return 0
+
+    firstLogId, untilLogId = cache.get(APPLIED_LOG_ID_KEY, 0), lastLogId()
+    logs = UserActivityLog.objects.filter(
+        id__gt=firstLogId, id__lte=untilLogId, action__in=list(ACTION_WEIGHTS) + list(RATING_ACTIONS)
+    ).order_by('user_id', 'id')
+
+    applied = 0
+    rows = logs.values_list('user_id', 'id', 'action', 'data', 'timeStamp').iterator(chunk_size=5000)
+    for userId, userRows in groupby(rows, key=itemgetter(0)):
+        applied += applyEvents(features, userId, [row[1:] for row in userRows])
+    markLogsApplied(untilLogId)
+    return applied
+
+
+def tasteRecommendations(userId, excludeBookIds=(), k=20):
+    """
+    Books closest to the user's taste vector by cosine similarity, best first: one sparse product against the
+    text features. None if the user has no taste vector yet.
+    """
+    tasteVector = TasteVector.objects.filter(user_id=userId).values_list('indices', 'weights').first()
+    features = textFeatureOperations.loadTextFeatures()
+    if features is None or not tasteVector or not tasteVector[0]:
+        return None
+
+    vector = normalize(sparseTaste(*tasteVector))
+    scores = features.similarities(vector)[0]
+    if excludeBookIds:
+        excludedRows = features.rowsFor(list(excludeBookIds))
+        scores[excludedRows[excludedRows >= 0]] = -numpy.inf
+
+    best = similarityOperations.topIndices(scores, k)
+    return features.bookIds[best[scores[best] > -numpy.inf]].tolist()
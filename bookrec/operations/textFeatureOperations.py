@@ -0,0 +1,244 @@
+import threading
+from itertools import islice
+
+import numpy
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from bookrec.operations import (
+    artefactOperations,
+    featureStoreOperations
+)
+from core.models import Book
+
+TEXT_FEATURES_ARTEFACT = 'text-features'
+TEXT_FEATURES_DELTA_ARTEFACT = 'text-features-delta'
+NUMBER_OF_FEATURES = 2 ** 20
+MIN_DOCUMENT_FREQUENCY = 3
+READ_CHUNK_SIZE = 2000
+
+_textFeatures = {
+    'versions': None,
+    'features': None,
+}
+_textFeaturesLock = threading.Lock()
+
+
+def combinedFeaturesForBook(book):
+    description = book.description or ""
+    authors = ", ".join(book.authors) if book.authors else ""
+    categories = ", ".join(book.categories) if book.categories else ""
+    return description + " " + authors + " " + categories
+
+
+def buildHashingVectorizer():
+    # Same analyser as the old TfidfVectorizer, but stateless: there is no vocabulary to fit or hold in memory.
+    return HashingVectorizer(
+        n_features=NUMBER_OF_FEATURES,
+        strip_accents='unicode',
+        analyzer='word',
+        token_pattern=r'\w{1,}',
+        ngram_range=(1, 3),
+        stop_words='english',
+        alternate_sign=False,
+        norm=None,
+        dtype=numpy.float32
+    )
+
+
+def hashedCounts(books):
+    return buildHashingVectorizer().transform(
+        combinedFeaturesForBook(book) for book in books
+    ).tocsr()
+
+
+def hashBooks(queryset):
+    """
+    Hashed term counts for the books in queryset, read from the database READ_CHUNK_SIZE books at a time.
+    """
+    books = queryset.order_by('id').only('id', 'description', 'authors', 'categories').iterator(
+        chunk_size=READ_CHUNK_SIZE
+    )
+    bookIds, chunks = [], []
+    while chunk := list(islice(books, READ_CHUNK_SIZE)):
+        bookIds.extend(book.id for book in chunk)
+        chunks.append(hashedCounts(chunk))
+
+    counts = sparse.vstack(chunks, format='csr') if chunks else sparse.csr_matrix(
+        (0, NUMBER_OF_FEATURES), dtype=numpy.float32
+    )
+    return numpy.array(bookIds, dtype=numpy.int64), counts
+
+
+def countSegment(bookIds, counts):
+    # Every row's indices are unique after hashing, so counting indices gives the document frequencies.
+    documentFrequencies = numpy.bincount(counts.indices, minlength=NUMBER_OF_FEATURES).astype(numpy.int32)
+    return {'bookIds': bookIds, 'counts': counts, 'documentFrequencies': documentFrequencies}
+
+
+def tfidfWeights(segments):
+    """
+    IDF from the summed document frequencies of the segments, and the TF-IDF norm of each of their rows.
+    """
+    documentFrequencies = sum(segment['documentFrequencies'].astype(numpy.int64) for segment in segments)
+    numberOfDocuments = sum(len(segment['bookIds']) for segment in segments)
+    idf = (numpy.log((1.0 + numberOfDocuments) / (1.0 + documentFrequencies)) + 1.0).astype(numpy.float32)
+    idf[documentFrequencies < MIN_DOCUMENT_FREQUENCY] = 0
+
+    squaredIdf = idf.astype(numpy.float64) ** 2
+    norms = numpy.sqrt(numpy.concatenate([segment['counts'].power(2) @ squaredIdf for segment in segments]))
+    norms[norms == 0] = 1.0
+    return idf, norms
+
+
+def saveSegment(name, segments, metadata=None):
+    """
+    Saves the last of segments with the IDF and norms over all of them, so workers map the weights instead
+    of recomputing them. Returns the saved version.
+    """
+    idf, norms = tfidfWeights(segments)
+    return artefactOperations.saveArtefact(name, {**segments[-1], 'idf': idf, 'norms': norms}, metadata)
+
+
+def buildTextFeatures():
+    """
+    Rebuilds the base segment from every book and empties the delta segment. Returns the number of books.
+    """
+    base = countSegment(*hashBooks(Book.objects.all()))
+    baseVersion = saveSegment(TEXT_FEATURES_ARTEFACT, [base])
+    artefactOperations.saveArtefact(
+        TEXT_FEATURES_DELTA_ARTEFACT, countSegment(*hashBooks(Book.objects.none())), {'baseVersion': baseVersion}
+    )
+    return len(base['bookIds'])
+
+
+def currentDelta(base):
+    # A delta appended to an earlier base overlaps this one and has stale weights; it is ignored until emptied.
+    delta = artefactOperations.loadArtefact(TEXT_FEATURES_DELTA_ARTEFACT)
+    if delta is None or delta.metadata.get('baseVersion') != base.version:
+        return None
+    return delta
+
+
+def appendNewBooks():
+    """
+    Hashes the books added since the last segment was written and appends them to the delta segment, so new
+    books get features without refitting anything. IDF and norms over both segments are recomputed and saved
+    with it. Run by `manage.py append_text_features`, never from a request: every append rewrites the delta
+    and makes every worker map it again. Concurrent appends converge: each one re-reads everything above the
+    last indexed id. Returns the number of books appended.
+    """
+    base = artefactOperations.loadArtefact(TEXT_FEATURES_ARTEFACT)
+    if base is None or len(base['bookIds']) == 0:
+        return 0
+
+    delta = currentDelta(base)
+    hasDelta = delta is not None and len(delta['bookIds']) > 0
+    lastBookId = int(delta['bookIds'][-1] if hasDelta else base['bookIds'][-1])
+
+    newBookIds, newCounts = hashBooks(Book.objects.filter(id__gt=lastBookId))
+    if len(newBookIds) == 0:
+        return 0
+
+    if hasDelta:
+        newBookIds = numpy.concatenate([delta['bookIds'], newBookIds])
+        newCounts = sparse.vstack([delta['counts'], newCounts], format='csr')
+    saveSegment(
+        TEXT_FEATURES_DELTA_ARTEFACT, [base, countSegment(newBookIds, newCounts)], {'baseVersion': base.version}
+    )
+    return len(newBookIds) - (len(delta['bookIds']) if hasDelta else 0)
+
+
+class TextFeatures:
+    """
+    TF-IDF view over the base and delta count segments. IDF comes from the summed document frequencies of
+    both segments, so appended books shift the weights the same way a refit would. The IDF and norms are
+    read from the last segment, which the job that wrote it computed them for; only the per-book ids live
+    in the worker, everything else stays memory-mapped.
+    """
+
+    def __init__(self, segments):
+        self.segments = [segment for segment in segments if segment is not None and len(segment['bookIds'])]
+        self.bookIds = numpy.concatenate([segment['bookIds'] for segment in self.segments])
+        self.offsets = numpy.cumsum([0] + [len(segment['bookIds']) for segment in self.segments])
+        self.rowById = featureStoreOperations.denseIndex(self.bookIds)
+
+        weights = self.segments[-1]
+        if 'idf' in weights:
+            self.idf, self.norms = weights['idf'], weights['norms']
+        else:
+            # Segments saved before the weights were persisted.
+            self.idf, self.norms = tfidfWeights(self.segments)
+
+    def rowsFor(self, bookIds):
+        """
+        Rows of the given book ids, -1 for books that have not been hashed yet.
+        """
+        return featureStoreOperations.lookupRows(self.rowById, bookIds)
+
+    def countsForRows(self, rows):
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        segmentIndices = numpy.searchsorted(self.offsets, rows, side='right') - 1
+        return sparse.vstack(
+            [
+                self.segments[segmentIndex]['counts'][[row - self.offsets[segmentIndex]]]
+                for row, segmentIndex in zip(rows, segmentIndices)
+            ],
+            format='csr'
+        )
+
+    def vectors(self, rows):
+        """
+        l2-normalised TF-IDF vectors of the given rows.
+        """
+        weighted = self.countsForRows(rows).multiply(self.idf).tocsr()
+        return sparse.diags(1.0 / self.norms[rows]) @ weighted
+
+    def transform(self, books):
+        """
+        l2-normalised TF-IDF vectors for books that are not in the segments yet.
+        """
+        return normalize(hashedCounts(books).multiply(self.idf).tocsr())
+
+    def similarities(self, vectors):
+        """
+        Dense cosine similarities between the given normalised vectors and every book, one row per vector.
+        """
+        weighted = vectors.multiply(self.idf).T.tocsc()
+        products = [(segment['counts'] @ weighted).T.toarray() for segment in self.segments]
+        return numpy.hstack(products) / self.norms
+
+    def matrix(self):
+        """
+        The full normalised TF-IDF matrix, for offline jobs that need every pair.
+        """
+        weighted = sparse.vstack([segment['counts'] for segment in self.segments], format='csr').multiply(self.idf)
+        return (sparse.diags(1.0 / self.norms) @ weighted).astype(numpy.float32).tocsr()
+
+
+def loadTextFeatures():
+    """
+    This worker's view over the current base and delta segments, or None if the base has not been built.
+    """
+    base = artefactOperations.loadArtefact(TEXT_FEATURES_ARTEFACT)
+    if base is None or len(base['bookIds']) == 0:
+        return None
+
+    delta = currentDelta(base)
+    versions = (base.version, delta.version if delta is not None else None)
+    with _textFeaturesLock:
+        if _textFeatures['versions'] != versions:
+            _textFeatures['features'] = TextFeatures([base, delta])
+            _textFeatures['versions'] = versions
+        return _textFeatures['features']
+
+
+def getTextFeatures():
+    """
+    Like loadTextFeatures, but hashes the catalogue first if the base segment has never been built.
+    """
+    features = loadTextFeatures()
+    if features is None and buildTextFeatures():
+        features = loadTextFeatures()
+    return features
@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+import redis
+
+from bookrec.operations import cacheOperations
+from core.models import UserActivityLog
+
+TRENDING_KEY = 'trending-books'
+TRENDING_LANDMARK_KEY = 'trending-books-landmark'
+HALF_LIFE = 60 * 60 * 6
+DECAY_RATE = math.log(2) / HALF_LIFE
+REBASE_INTERVAL = 60 * 60 * 24 * 7
+MINIMUM_SCORE = 1e-3
+MAXIMUM_BOOKS = 10000
+FLUSH_SIZE = 50
+FLUSH_INTERVAL = 10
+
+ACTION_WEIGHTS = {
+    UserActivityLog.Action.VIEW_BOOK: 1.0,
+    UserActivityLog.Action.ADD_TO_TO_READ: 2.0,
+    UserActivityLog.Action.ADD_TO_HAVE_READ: 2.0,
+    UserActivityLog.Action.ADD_TO_READING_NOW: 3.0,
+    UserActivityLog.Action.ADD_COMMENT: 3.0,
+    UserActivityLog.Action.ADD_TO_FAVOURITES: 5.0,
+}
+
+# Events are buffered per worker and written in one pipeline. Scores in the buffer are decayed relative to
+# the time the buffer was started, so they can be rescaled to whatever landmark is current at flush time.
+_pending = {
+    'startedAt': time.time(),
+    'numberOfEvents': 0,
+    'scores': defaultdict(float),
+}
+_pendingLock = threading.Lock()
+
+
+def trendingKeys():
+    return cacheOperations.redisKey(TRENDING_KEY), cacheOperations.redisKey(TRENDING_LANDMARK_KEY)
+
+
+def getLandmark():
+    """
+    Forward decay: an event at time t adds weight * exp(DECAY_RATE * (t - landmark)), so older events never
+    have to be touched and ranking by the stored score is ranking by the exponentially decayed count.
+    The landmark is a plain Redis string next to the scores, so transactions can WATCH it.
+    """
+    _, landmarkKey = trendingKeys()
+    client = cacheOperations.redisClient()
+    client.set(landmarkKey, time.time(), nx=True)
+    return float(client.get(landmarkKey))
+
+
+def recordEvent(action, data, timestamp=None):
+    weight = ACTION_WEIGHTS.get(action)
+    isbn13 = (data or {}).get('book-isbn13')
+    if weight is None or not isbn13:
+        return
+
+    timestamp = timestamp or time.time()
+    with _pendingLock:
+        if not _pending['scores']:
+            _pending['startedAt'] = time.time()
+        _pending['scores'][isbn13] += weight * math.exp(DECAY_RATE * (timestamp - _pending['startedAt']))
+        _pending['numberOfEvents'] += 1
+        shouldFlush = (
+            _pending['numberOfEvents'] >= FLUSH_SIZE or time.time() - _pending['startedAt'] >= FLUSH_INTERVAL
+        )
+    if shouldFlush:
+        flush()
+
+
+def flush():
+    """
+    Writes the buffered scores in one transaction under a WATCH of the landmark: if a rebase moves it between
+    reading it and writing, the scores are rescaled to the new landmark and written again.
+    """
+    with _pendingLock:
+        scores, startedAt = _pending['scores'], _pending['startedAt']
+        _pending['scores'] = defaultdict(float)
+        _pending['numberOfEvents'] = 0
+        _pending['startedAt'] = time.time()
+    if not scores:
+        return
+
+    key, landmarkKey = trendingKeys()
+    landmark = getLandmark()
+    with cacheOperations.redisClient().pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(landmarkKey)
+                landmark = float(pipeline.get(landmarkKey) or landmark)
+                scale = math.exp(DECAY_RATE * (startedAt - landmark))
+                pipeline.multi()
+                for isbn13, score in scores.items():
+                    pipeline.zincrby(key, score * scale, isbn13)
+                pipeline.execute()
+                break
+            except redis.WatchError:
+                continue
+
+    if time.time() - landmark >= REBASE_INTERVAL:
+        rebase()
+
+
+def rebase():
+    """
+    Moves the landmark to now so the stored scores stay far from float overflow, and drops books whose
+    decayed score has become negligible. Rescaling and moving the landmark are one MULTI/EXEC, so a flush
+    lands either wholly before or wholly after it; of concurrent rebases only the first one commits.
+    """
+    key, landmarkKey = trendingKeys()
+    with cacheOperations.redisClient().pipeline() as pipeline:
+        try:
+            pipeline.watch(landmarkKey)
+            now = time.time()
+            landmark = float(pipeline.get(landmarkKey) or now)
+            if now - landmark < REBASE_INTERVAL:
+                return
+            pipeline.multi()
+            pipeline.zunionstore(key, {key: math.exp(-DECAY_RATE * (now - landmark))})
+            pipeline.zremrangebyscore(key, '-inf', MINIMUM_SCORE)
+            pipeline.zremrangebyrank(key, 0, -MAXIMUM_BOOKS - 1)
+            pipeline.set(landmarkKey, now)
+            pipeline.execute()
+        except redis.WatchError:
+            pass
+
+
+def trendingIsbn13s(k=20):
+    """
+    The k books with the highest decayed activity, best first. One ZREVRANGE, independent of table sizes.
+    """
+    flush()
+    key, _ = trendingKeys()
+    return [isbn13.decode() for isbn13 in cacheOperations.redisClient().zrevrange(key, 0, k - 1)]
+
+
+def reset(landmark):
+    key, landmarkKey = trendingKeys()
+    with cacheOperations.redisClient().pipeline() as pipeline:
+        pipeline.delete(key)
+        pipeline.set(landmarkKey, landmark)
+        pipeline.execute()
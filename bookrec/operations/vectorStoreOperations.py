@@ -0,0 +1,162 @@
+import threading
+
+import numpy
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from bookrec.operations import (
+    artefactOperations,
+    featureStoreOperations,
+    similarityOperations,
+    textFeatureOperations
+)
+
+VECTOR_STORE_ARTEFACT = 'book-vectors'
+DTYPES = ('float32', 'float16', 'int8')
+DEFAULT_DTYPE = 'int8'
+DEFAULT_DIMENSIONS = 128
+SVD_SAMPLE_SIZE = 50000
+EMBED_CHUNK_SIZE = 16384
+SCORE_CHUNK_SIZE = 2048
+INT8_LEVELS = 127
+
+_vectorStore = {
+    'version': None,
+    'store': None,
+}
+_vectorStoreLock = threading.Lock()
+
+
+def embedBooks(tfvMatrix, dimensions=DEFAULT_DIMENSIONS, sampleSize=SVD_SAMPLE_SIZE, seed=0):
+    """
+    Dense l2-normalised book embeddings: a truncated SVD (LSA) of the TF-IDF rows, fitted on a sample of at
+    most sampleSize books and applied EMBED_CHUNK_SIZE rows at a time.
+    """
+    numberOfBooks = tfvMatrix.shape[0]
+    dimensions = min(dimensions, numberOfBooks - 1)
+    randomState = numpy.random.default_rng(seed)
+    sample = numpy.sort(randomState.choice(numberOfBooks, size=min(sampleSize, numberOfBooks), replace=False))
+    svd = TruncatedSVD(n_components=dimensions, algorithm='randomized', random_state=seed).fit(tfvMatrix[sample])
+
+    embeddings = numpy.empty((numberOfBooks, dimensions), dtype=numpy.float32)
+    for start in range(0, numberOfBooks, EMBED_CHUNK_SIZE):
+        embeddings[start:start + EMBED_CHUNK_SIZE] = svd.transform(tfvMatrix[start:start + EMBED_CHUNK_SIZE])
+    return normalize(embeddings, copy=False)
+
+
+def quantise(embeddings, dtype):
+    """
+    Encodes float32 embeddings as dtype. int8 uses symmetric per-row scales, so each row keeps its own range.
+    Returns (codes, scales); scales is None for the float types.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f'dtype must be one of {", ".join(DTYPES)}, got {dtype}')
+    if dtype != 'int8':
+        return embeddings.astype(dtype), None
+
+    scales = numpy.abs(embeddings).max(axis=1) / INT8_LEVELS
+    scales[scales == 0] = 1.0
+    codes = numpy.rint(embeddings / scales[:, None]).astype(numpy.int8)
+    return codes, scales.astype(numpy.float32)
+
+
+class VectorStore:
+    """
+    Row-major book embeddings in float32, float16 or int8. Scoring upcasts SCORE_CHUNK_SIZE contiguous rows at
+    a time and hands them to a float32 BLAS matrix-vector product, so the temporary stays cache-sized however
+    large the store is. int8 is both the smallest and, after float32, the fastest to scan: NumPy's float16
+    conversion is not vectorised.
+    """
+
+    def __init__(self, bookIds, codes, scales=None, artefact=None):
+        self.bookIds = bookIds
+        self.codes = codes
+        self.scales = scales
+        self.artefact = artefact
+        self.rowById = featureStoreOperations.denseIndex(bookIds) if artefact is None else None
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rowsFor(self, bookIds):
+        if self.artefact is not None:
+            return featureStoreOperations.artefactRows(self.artefact, bookIds)
+        return featureStoreOperations.lookupRows(self.rowById, bookIds)
+
+    def vectors(self, rows):
+        vectors = self.codes[rows].astype(numpy.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows, None]
+        return vectors
+
+    def scores(self, query):
+        """
+        Dot product of a float32 query with every stored vector; the cosine similarity for normalised queries.
+        """
+        query = numpy.asarray(query, dtype=numpy.float32)
+        scores = numpy.empty(len(self.bookIds), dtype=numpy.float32)
+        for start in range(0, len(scores), SCORE_CHUNK_SIZE):
+            chunk = self.codes[start:start + SCORE_CHUNK_SIZE].astype(numpy.float32, copy=False)
+            scores[start:start + SCORE_CHUNK_SIZE] = chunk @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def nearest(self, query, k, excludeRows=()):
+        """
+        Rows of the k stored vectors closest to query, best first.
+        """
+        scores = self.scores(query)
+        scores[list(excludeRows)] = -numpy.inf
+        best = similarityOperations.topIndices(scores, k)
+        return best[scores[best] > -numpy.inf]
+
+    def similarBookIds(self, bookId, k):
+        row = self.rowsFor([bookId])[0]
+        if row < 0:
+            return None
+        return self.bookIds[self.nearest(self.vectors([row])[0], k, excludeRows=[row])].tolist()
+
+
+def buildVectorStore(dtype=DEFAULT_DTYPE, dimensions=DEFAULT_DIMENSIONS):
+    """
+    Embeds every book's text features and saves them as a memory-mapped store of the given dtype.
+    Returns the number of books stored.
+    """
+    features = textFeatureOperations.getTextFeatures()
+    if features is None or len(features.bookIds) < 2:
+        return 0
+
+    codes, scales = quantise(embedBooks(features.matrix(), dimensions), dtype)
+    arrays = {'bookIds': features.bookIds, 'codes': codes}
+    if scales is not None:
+        arrays['scales'] = scales
+    artefactOperations.saveArtefact(
+        VECTOR_STORE_ARTEFACT, arrays, metadata={'dtype': dtype, 'dimensions': codes.shape[1]}
+    )
+    return len(features.bookIds)
+
+
+def loadVectorStore():
+    artefact = artefactOperations.loadArtefact(VECTOR_STORE_ARTEFACT)
+    if artefact is None:
+        return None
+
+    with _vectorStoreLock:
+        if _vectorStore['version'] != artefact.version:
+            _vectorStore['store'] = VectorStore(
+                artefact['bookIds'], artefact['codes'], artefact['scales'] if 'scales' in artefact else None, artefact
+            )
+            _vectorStore['version'] = artefact.version
+        return _vectorStore['store']
+
+
+def similarBookIds(bookId, k):
+    """
+    The k books closest to bookId in the embedding store, or None if the store is not built or lacks the book.
+    """
+    store = loadVectorStore()
+    if store is None:
+        return None
+    return store.similarBookIds(bookId, k)
@@ -99,6 +99,22 @@ CACHES = {
     }
 }
 
+# Recommendation models
+# Offline-built recommender artefacts, e.g. `python manage.py build_similarity_index`
+
+RECOMMENDATION_MODELS_DIR = config('RECOMMENDATION_MODELS_DIR', default=os.path.join(BASE_DIR, 'models'), cast=str)
+
+# Google Books API, configurable so a local stub server can stand in for it
+GOOGLE_BOOKS_API_URL = config('GOOGLE_BOOKS_API_URL', default='https://www.googleapis.com/books/v1', cast=str)
+# Per-worker cache of Google Books responses: seconds to keep results, seconds to keep "no results" answers and
+# the most bytes of response bodies to hold before evicting the least recently used
+GOOGLE_BOOKS_CACHE_TTL = config('GOOGLE_BOOKS_CACHE_TTL', default=60 * 60, cast=int)
+GOOGLE_BOOKS_NEGATIVE_CACHE_TTL = config('GOOGLE_BOOKS_NEGATIVE_CACHE_TTL', default=60 * 5, cast=int)
+GOOGLE_BOOKS_CACHE_MAX_BYTES = config('GOOGLE_BOOKS_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+
+# Seconds a page waits for a recommender that has nothing cached before serving a fallback; 0 waits forever.
+RECOMMENDATION_TIME_BUDGET = config('RECOMMENDATION_TIME_BUDGET', default=0.5, cast=float)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -3,8 +3,12 @@ from django.contrib import admin
 from core.models import (
     Book,
     BookReview,
+    BookScore,
     Category,
+    GenreTopBook,
     Profile,
+    Recommendation,
+    TasteVector,
     UserActivityLog
 )
 
@@ -19,16 +23,36 @@ class BookReviewAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(BookScore)
+class BookScoreAdmin(admin.ModelAdmin):
+    pass
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(GenreTopBook)
+class GenreTopBookAdmin(admin.ModelAdmin):
+    pass
+
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(Recommendation)
+class RecommendationAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(TasteVector)
+class TasteVectorAdmin(admin.ModelAdmin):
+    pass
+
+
 @admin.register(UserActivityLog)
 class UserActivityLogAdmin(admin.ModelAdmin):
     pass
@@ -12,6 +12,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from bookrec.operations import (
+    bookOperations,
+    collaborativeOperations,
     emailOperations,
     generalOperations,
     logOperations
@@ -20,6 +22,7 @@ from core.models import (
     Book,
     BookReview,
     Profile,
+    Recommendation,
     UserActivityLog
 )
 from core.serializers import (
@@ -93,7 +96,11 @@ class BookReviewActionApiVersion1(APIView):
             }
         )
 
-        data = {'book-isbn13': kwargs.get('isbn13'), 'book-title': book.title}
+        data = {
+            'book-isbn13': kwargs.get('isbn13'),
+            'book-title': book.title,
+            'rating': int(request.data.get('rating'))
+        }
 
         if not created:
             bookReview.comment = request.data.get('comment')
@@ -103,6 +110,7 @@ class BookReviewActionApiVersion1(APIView):
             logOperations.log(request, UserActivityLog.Action.EDIT_COMMENT, data)
         else:
             logOperations.log(request, UserActivityLog.Action.ADD_COMMENT, data)
+        bookOperations.forgetPrecomputedBookIds(Recommendation.Recommender.BOOKS_BASED_ON_RATING, self.request.user.id)
 
         bookReview.likes.add(self.request.user)
         serializer = BookReviewSerializerV1(bookReview, context={'request': self.request})
@@ -202,6 +210,7 @@ class BookReviewActionApiVersion1(APIView):
             {'book-isbn13': kwargs.get('isbn13'), 'book-title': bookReview.book.title}
         )
         bookReview.delete()
+        bookOperations.forgetPrecomputedBookIds(Recommendation.Recommender.BOOKS_BASED_ON_RATING, self.request.user.id)
 
         response = {
             'success': True,
@@ -255,6 +264,11 @@ class UserReadingInfoApiVersion1(APIView):
             action = request.data.get('action')
             try:
                 getattr(getattr(book, field), action)(self.request.user)
+                if field == 'favouriteRead':
+                    collaborativeOperations.recordFavouriteChange(self.request.user.id, book.id, action == 'add')
+                    bookOperations.forgetPrecomputedBookIds(
+                        Recommendation.Recommender.OTHER_USERS_FAVOURITE_BOOKS, self.request.user.id
+                    )
                 logOperations.log(
                     request,
                     self.LOG_ACTIONS[field][action],
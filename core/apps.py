@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import pre_migrate
+
+POSTGRES_EXTENSIONS = ('pg_trgm',)
+
+
+def createPostgresExtensions(using, **kwargs):
+    # The trigram indexes need pg_trgm before any migration creates them.
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for extension in POSTGRES_EXTENSIONS:
+            cursor.execute(f'CREATE EXTENSION IF NOT EXISTS {extension}')
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        pre_migrate.connect(createPostgresExtensions, sender=self)
@@ -6,12 +6,14 @@ from django.core.exceptions import ValidationError
 from django.db import transaction
 
 from bookrec.operations import (
+    bookOperations,
     generalOperations,
     logOperations
 )
 from core.models import (
     Category,
     Profile,
+    Recommendation,
     UserActivityLog
 )
 
@@ -248,6 +250,9 @@ class UserSettingsProfileUpdateForm(BaseUserAndProfileForm):
 
         self.request.user.save(update_fields=['first_name', 'last_name'])
         self.request.user.profile.save(update_fields=['favouriteGenres'])
+        bookOperations.forgetPrecomputedBookIds(
+            Recommendation.Recommender.BOOKS_BASED_ON_FAVOURITE_GENRES, self.request.user.id
+        )
         messages.success(self.request, 'Profile update successfully.')
         logOperations.log(self.request, UserActivityLog.Action.UPDATE_PROFILE)
 
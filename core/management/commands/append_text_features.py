@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import textFeatureOperations
+
+
+class Command(BaseCommand):
+    help = "🧩 Hashes books added since the text features were built and refreshes their IDF. Run it periodically."
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Appending new books to the text features...\n")
+        numberOfBooks = textFeatureOperations.appendNewBooks()
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Appended {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
@@ -0,0 +1,121 @@
+import json
+import time
+
+import numpy
+from django.core.management.base import BaseCommand
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from bookrec.operations import (
+    annOperations,
+    similarityOperations,
+    textFeatureOperations
+)
+
+
+def syntheticVectors(numberOfVectors, numberOfFeatures, seed):
+    """
+    Clustered sparse vectors that look roughly like TF-IDF rows: each row shares most of its terms
+    with one of numberOfVectors / 100 topic centroids.
+    """
+    randomState = numpy.random.default_rng(seed)
+    numberOfClusters = max(1, numberOfVectors // 100)
+    centroids = sparse.random(
+        numberOfClusters, numberOfFeatures, density=40 / numberOfFeatures, format='csr', rng=randomState
+    )
+    noise = sparse.random(
+        numberOfVectors, numberOfFeatures, density=20 / numberOfFeatures, format='csr', rng=randomState
+    )
+    assignments = randomState.integers(0, numberOfClusters, size=numberOfVectors)
+    return normalize(centroids[assignments] + noise * 0.5).astype(numpy.float32)
+
+
+def percentile(values, q):
+    return float(numpy.percentile(values, q)) if len(values) else 0.0
+
+
+class Command(BaseCommand):
+    help = "⏱️ Measures recall and latency of the LSH index against the exact scan over book vectors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=0, help='Use N synthetic vectors instead of the catalogue.')
+        parser.add_argument('--features', type=int, default=2 ** 18, help='Dimensions of the synthetic vectors.')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--k', type=int, default=similarityOperations.NUMBER_OF_NEIGHBOURS)
+        parser.add_argument('--tables', type=int, nargs='+', default=[annOperations.DEFAULT_NUMBER_OF_TABLES])
+        parser.add_argument('--bits', type=int, nargs='+', default=[annOperations.DEFAULT_NUMBER_OF_BITS])
+        parser.add_argument('--probes', type=int, nargs='+', default=[annOperations.DEFAULT_NUMBER_OF_PROBES])
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this file.')
+
+    def loadVectors(self, kwargs):
+        if kwargs['books']:
+            return syntheticVectors(kwargs['books'], kwargs['features'], kwargs['seed'])
+
+        return textFeatureOperations.getTextFeatures().matrix()
+
+    def handle(self, *args, **kwargs):
+        vectors = self.loadVectors(kwargs)
+        randomState = numpy.random.default_rng(kwargs['seed'])
+        queryRows = randomState.choice(vectors.shape[0], size=min(kwargs['queries'], vectors.shape[0]), replace=False)
+        k = kwargs['k']
+        self.stdout.write(f"🔹 Benchmarking {len(queryRows)} queries over {vectors.shape[0]} vectors, k={k}\n")
+
+        results = []
+        for numberOfTables in kwargs['tables']:
+            for numberOfBits in kwargs['bits']:
+                for numberOfProbes in kwargs['probes']:
+                    results.append(
+                        self.benchmark(vectors, queryRows, k, numberOfTables, numberOfBits, numberOfProbes, kwargs)
+                    )
+
+        for result in results:
+            self.stdout.write(
+                f"tables={result['tables']} bits={result['bits']} probes={result['probes']} "
+                f"recall@{k}={result['recall']:.3f} "
+                f"ann p50/p95={result['annLatencyP50Ms']:.2f}/{result['annLatencyP95Ms']:.2f}ms "
+                f"exact p50/p95={result['exactLatencyP50Ms']:.2f}/{result['exactLatencyP95Ms']:.2f}ms "
+                f"candidates={result['meanCandidates']:.0f} build={result['buildSeconds']:.2f}s"
+            )
+
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as file:
+                json.dump({'books': vectors.shape[0], 'queries': len(queryRows), 'k': k, 'results': results}, file,
+                          indent=4)
+            self.stdout.write(f"✅ Results written to {kwargs['output']}\n")
+
+    def benchmark(self, vectors, queryRows, k, numberOfTables, numberOfBits, numberOfProbes, kwargs):
+        startTime = time.perf_counter()
+        index = annOperations.RandomProjectionIndex(
+            numberOfTables, numberOfBits, numberOfProbes, kwargs['seed']
+        ).build(vectors)
+        buildSeconds = time.perf_counter() - startTime
+
+        recalls, candidates, annLatencies, exactLatencies = [], [], [], []
+        for row in queryRows:
+            vector = vectors[row]
+
+            startTime = time.perf_counter()
+            exactIds, _ = index.exactQuery(vector, k, exclude=[row])
+            exactLatencies.append((time.perf_counter() - startTime) * 1000)
+
+            startTime = time.perf_counter()
+            annIds, _ = index.query(vector, k, exclude=[row])
+            annLatencies.append((time.perf_counter() - startTime) * 1000)
+
+            candidates.append(len(index.candidates(vector)))
+            if len(exactIds):
+                recalls.append(len(numpy.intersect1d(exactIds, annIds)) / len(exactIds))
+
+        return {
+            'tables': numberOfTables,
+            'bits': numberOfBits,
+            'probes': numberOfProbes,
+            'recall': float(numpy.mean(recalls)) if recalls else 0.0,
+            'meanCandidates': float(numpy.mean(candidates)),
+            'annLatencyP50Ms': percentile(annLatencies, 50),
+            'annLatencyP95Ms': percentile(annLatencies, 95),
+            'exactLatencyP50Ms': percentile(exactLatencies, 50),
+            'exactLatencyP95Ms': percentile(exactLatencies, 95),
+            'buildSeconds': buildSeconds,
+        }
@@ -0,0 +1,221 @@
+import json
+import platform
+import random
+import resource
+import time
+import tracemalloc
+
+import numpy
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import (
+    RequestFactory,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from tqdm import tqdm
+
+from bookrec.operations import (
+    alsoViewedOperations,
+    bookOperations,
+    collaborativeOperations,
+    factorisationOperations,
+    featureStoreOperations,
+    genreOperations,
+    similarityOperations
+)
+from core.management.commands import bake
+from core.models import (
+    Book,
+    BookReview,
+    Profile
+)
+
+RECOMMENDERS = {
+    'recentlyAddedBooks': lambda sample: bookOperations.recentlyAddedBookItems(),
+    'booksBasedOnRatings': lambda sample: bookOperations.popularBookItems(),
+    'booksBasedOnViewings': lambda sample: bookOperations.tasteBookItems(sample['userId'], sample['history']),
+    'booksBasedOnRating': lambda sample: list(
+        bookOperations.booksInOrder(bookOperations.booksBasedOnRatingIds(sample['userId'])).filter(averageRating__gte=3)
+    ),
+    'otherUsersFavouriteBooks': lambda sample: bookOperations.otherUsersFavouriteBookItems(sample['userId']),
+    'similarBooks': lambda sample: bookOperations.similarBookItems(sample['book']),
+    'alsoViewedBooks': lambda sample: bookOperations.alsoViewedBookItems(sample['book']),
+    'personalisedBooks': lambda sample: bookOperations.personalisedBookItems(sample['userId']),
+    'booksBasedOnFavouriteGenres': lambda sample: list(
+        bookOperations.booksBasedOnFavouriteGenres(sample['request'])[:20]
+    ),
+}
+
+MODELS = {
+    'buildBookStore': featureStoreOperations.buildBookStore,
+    'refreshBookScores': bookOperations.refreshBookScores,
+    'buildGenreTopBooks': genreOperations.buildGenreTopBooks,
+    'buildSimilarityIndex': similarityOperations.buildSimilarityIndex,
+    'buildItemSimilarityModel': collaborativeOperations.buildItemSimilarityModel,
+    'buildFavouritesMatrix': collaborativeOperations.buildFavouritesMatrix,
+    'buildImplicitModel': factorisationOperations.buildImplicitModel,
+    'buildAlsoViewedModel': alsoViewedOperations.buildAlsoViewedModel,
+}
+
+
+def peakRssMegabytes():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def measure(function, *args):
+    """
+    Runs function once under tracemalloc and a query capture. Returns the peak traced allocation in MB
+    and the number of queries it issued.
+    """
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), len(queries)
+
+
+class Command(BaseCommand):
+    help = (
+        "⏱️ Seeds synthetic catalogues of increasing size and reports latency, memory and query counts for "
+        "every recommender. Deletes all books, non-superuser users and reviews first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--users-per-book', type=float, default=0.1, help='Users seeded per book.')
+        parser.add_argument('--reviews-per-user', type=int, default=20)
+        parser.add_argument('--favourites-per-user', type=int, default=10)
+        parser.add_argument('--history', type=int, default=10, help='Viewed books per simulated session.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed calls per recommender.')
+        parser.add_argument('--recommenders', type=str, nargs='+', choices=list(RECOMMENDERS), default=None)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this file.')
+
+    # Without a time budget every recommender runs on the calling thread: no call returns a fallback, and
+    # CaptureQueriesContext, which only sees this thread's connection, counts all of their queries.
+    @override_settings(RECOMMENDATION_TIME_BUDGET=0)
+    def handle(self, *args, **kwargs):
+        random.seed(kwargs['seed'])
+        recommenders = kwargs['recommenders'] or list(RECOMMENDERS)
+
+        results = []
+        for numberOfBooks in kwargs['books']:
+            numberOfUsers = max(20, int(numberOfBooks * kwargs['users_per_book']))
+            self.stdout.write(f"\n📚 Seeding {numberOfBooks} books and {numberOfUsers} users...\n")
+            self.seedCatalogue(numberOfBooks, numberOfUsers, kwargs)
+
+            result = {
+                'books': numberOfBooks,
+                'users': numberOfUsers,
+                'reviews': BookReview.objects.count(),
+                'models': {name: self.benchmarkModel(name, build) for name, build in MODELS.items()},
+                'recommenders': {},
+            }
+            samples = self.samples(kwargs['iterations'], kwargs['history'])
+            for name in recommenders:
+                result['recommenders'][name] = self.benchmarkRecommender(name, RECOMMENDERS[name], samples)
+            result['peakRssMegabytes'] = round(peakRssMegabytes(), 1)
+            results.append(result)
+
+        report = {
+            'createdAt': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'results': results,
+        }
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as file:
+                json.dump(report, file, indent=4)
+            self.stdout.write(f"\n✅ Results written to {kwargs['output']}")
+
+    def seedCatalogue(self, numberOfBooks, numberOfUsers, kwargs):
+        # Deleting the books also removes their reviews, favourites and precomputed recommendations, so the
+        # recommenders below always take their live paths. bake's own review seeding samples every user for
+        # every book, which is quadratic, so only its book seeding is reused and the users, ratings and
+        # favourites are generated in bulk here.
+        seeder = bake.Command()
+        seeder.stdout = self.stdout
+        seeder.NUMBER_OF_BOOKS = numberOfBooks
+        seeder.NUMBER_OF_BOOKS_BATCH = 1000
+        seeder.seedBooks()
+
+        Profile.objects.filter(user__is_superuser=False).delete()
+        User.objects.filter(is_superuser=False).delete()
+        password = make_password("admin")
+        User.objects.bulk_create(
+            [
+                User(username=f'benchmark-{i}@bookrec.test', email=f'benchmark-{i}@bookrec.test', password=password)
+                for i in range(numberOfUsers)
+            ],
+            batch_size=1000
+        )
+        userIds = list(User.objects.filter(is_superuser=False).values_list('id', flat=True))
+        Profile.objects.bulk_create(
+            [Profile(user_id=userId, favouriteGenres=random.sample(bake.genres, random.randint(2, 5)))
+             for userId in userIds],
+            batch_size=1000
+        )
+
+        bookIds = list(Book.objects.values_list('id', flat=True))
+        reviews, favourites = [], []
+        for userId in tqdm(userIds, desc="Users rated", unit="user"):
+            for bookId in random.sample(bookIds, min(kwargs['reviews_per_user'], len(bookIds))):
+                reviews.append(BookReview(book_id=bookId, creator_id=userId, rating=random.randint(0, 5),
+                                          comment="Benchmark review"))
+            for bookId in random.sample(bookIds, min(kwargs['favourites_per_user'], len(bookIds))):
+                favourites.append(Book.favouriteRead.through(book_id=bookId, user_id=userId))
+
+        BookReview.objects.bulk_create(reviews, batch_size=5000)
+        Book.favouriteRead.through.objects.bulk_create(favourites, batch_size=5000, ignore_conflicts=True)
+
+    def samples(self, iterations, historyLength):
+        factory = RequestFactory()
+        users = list(User.objects.filter(is_superuser=False).select_related('profile').order_by('?')[:iterations])
+        books = list(Book.objects.order_by('?')[:iterations])
+        isbn13s = list(Book.objects.values_list('isbn13', flat=True))
+
+        samples = []
+        for user, book in zip(users, books):
+            request = factory.get('/')
+            request.user = user
+            history = random.sample(isbn13s, min(historyLength, len(isbn13s)))
+            request.session = {'history': history}
+            samples.append({'request': request, 'userId': user.id, 'book': book, 'history': history})
+        return samples
+
+    def benchmarkModel(self, name, build):
+        startTime = time.perf_counter()
+        build()
+        elapsedTime = time.perf_counter() - startTime
+        self.stdout.write(f"🔹 {name}: built in {elapsedTime:.2f} seconds")
+        return {'seconds': round(elapsedTime, 3)}
+
+    def benchmarkRecommender(self, name, recommender, samples):
+        # The first call warms the per-worker model caches so the timings reflect steady state.
+        recommender(samples[0])
+
+        latencies = []
+        for sample in samples:
+            startTime = time.perf_counter()
+            recommender(sample)
+            latencies.append((time.perf_counter() - startTime) * 1000)
+
+        peakMegabytes, numberOfQueries = measure(recommender, samples[0])
+        result = {
+            'p50Milliseconds': round(float(numpy.percentile(latencies, 50)), 2),
+            'p95Milliseconds': round(float(numpy.percentile(latencies, 95)), 2),
+            'peakTracedMegabytes': round(peakMegabytes, 2),
+            'queries': numberOfQueries,
+        }
+        self.stdout.write(
+            f"⏱️ {name}: p50 {result['p50Milliseconds']} ms, p95 {result['p95Milliseconds']} ms, "
+            f"peak {result['peakTracedMegabytes']} MB, {result['queries']} queries"
+        )
+        return result
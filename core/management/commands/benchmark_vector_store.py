@@ -0,0 +1,120 @@
+import json
+import time
+
+import numpy
+from django.core.management.base import BaseCommand
+from sklearn.preprocessing import normalize
+
+from bookrec.operations import (
+    similarityOperations,
+    textFeatureOperations,
+    vectorStoreOperations
+)
+
+
+def syntheticEmbeddings(numberOfVectors, dimensions, seed):
+    """
+    Clustered unit vectors shaped like book embeddings: each row is one of numberOfVectors / 100 topic
+    centroids plus noise. Generated in chunks so a million rows never need a float64 copy.
+    """
+    randomState = numpy.random.default_rng(seed)
+    numberOfClusters = max(1, numberOfVectors // 100)
+    centroids = randomState.standard_normal((numberOfClusters, dimensions), dtype=numpy.float32)
+    embeddings = numpy.empty((numberOfVectors, dimensions), dtype=numpy.float32)
+    for start in range(0, numberOfVectors, vectorStoreOperations.EMBED_CHUNK_SIZE):
+        end = min(start + vectorStoreOperations.EMBED_CHUNK_SIZE, numberOfVectors)
+        assignments = randomState.integers(0, numberOfClusters, size=end - start)
+        noise = randomState.standard_normal((end - start, dimensions), dtype=numpy.float32)
+        embeddings[start:end] = centroids[assignments] + noise * 0.7
+    return normalize(embeddings, copy=False)
+
+
+def percentile(values, q):
+    return float(numpy.percentile(values, q)) if len(values) else 0.0
+
+
+class Command(BaseCommand):
+    help = "⏱️ Compares memory, latency and recall of the float32, float16 and int8 book vector stores."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=0, help='Use N synthetic vectors instead of the catalogue.')
+        parser.add_argument('--dimensions', type=int, default=vectorStoreOperations.DEFAULT_DIMENSIONS)
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--k', type=int, default=similarityOperations.NUMBER_OF_NEIGHBOURS)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this file.')
+
+    def loadEmbeddings(self, kwargs):
+        if kwargs['books']:
+            return syntheticEmbeddings(kwargs['books'], kwargs['dimensions'], kwargs['seed'])
+
+        features = textFeatureOperations.getTextFeatures()
+        return vectorStoreOperations.embedBooks(features.matrix(), kwargs['dimensions'], seed=kwargs['seed'])
+
+    def handle(self, *args, **kwargs):
+        startTime = time.perf_counter()
+        embeddings = self.loadEmbeddings(kwargs)
+        bookIds = numpy.arange(len(embeddings), dtype=numpy.int64)
+        self.stdout.write(
+            f"🔹 Embedded {len(embeddings)} books in {embeddings.shape[1]} dimensions "
+            f"in {time.perf_counter() - startTime:.2f} seconds\n"
+        )
+
+        randomState = numpy.random.default_rng(kwargs['seed'])
+        queryRows = randomState.choice(len(embeddings), size=min(kwargs['queries'], len(embeddings)), replace=False)
+        k = kwargs['k']
+
+        # Exact neighbours of the unquantised embeddings are the reference every store is measured against.
+        reference = vectorStoreOperations.VectorStore(bookIds, embeddings)
+        exactRows = {row: reference.nearest(embeddings[row], k, excludeRows=[row]) for row in queryRows}
+
+        results = []
+        for dtype in vectorStoreOperations.DTYPES:
+            codes, scales = vectorStoreOperations.quantise(embeddings, dtype)
+            results.append(self.benchmark(dtype, vectorStoreOperations.VectorStore(bookIds, codes, scales),
+                                          embeddings, queryRows, exactRows, k))
+
+        for result in results:
+            self.stdout.write(
+                f"{result['dtype']}: {result['megabytes']:.1f} MB ({result['megabytesPerMillionBooks']:.0f} MB per "
+                f"1M books) p50/p95={result['latencyP50Ms']:.2f}/{result['latencyP95Ms']:.2f}ms "
+                f"recall@{k}={result['recall']:.3f} max score error={result['maxScoreError']:.4f}"
+            )
+
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as file:
+                json.dump(
+                    {
+                        'books': len(embeddings),
+                        'dimensions': embeddings.shape[1],
+                        'queries': len(queryRows),
+                        'k': k,
+                        'results': results
+                    },
+                    file,
+                    indent=4
+                )
+            self.stdout.write(f"✅ Results written to {kwargs['output']}\n")
+
+    def benchmark(self, dtype, store, embeddings, queryRows, exactRows, k):
+        recalls, latencies, scoreErrors = [], [], []
+        for row in queryRows:
+            query = store.vectors([row])[0]
+
+            startTime = time.perf_counter()
+            rows = store.nearest(query, k, excludeRows=[row])
+            latencies.append((time.perf_counter() - startTime) * 1000)
+
+            if len(exactRows[row]):
+                recalls.append(len(numpy.intersect1d(exactRows[row], rows)) / len(exactRows[row]))
+            scoreErrors.append(float(numpy.abs(store.scores(query) - embeddings @ embeddings[row]).max()))
+
+        return {
+            'dtype': dtype,
+            'megabytes': store.nbytes / (1024 * 1024),
+            'megabytesPerMillionBooks': store.nbytes / len(embeddings) * 1e6 / (1024 * 1024),
+            'latencyP50Ms': percentile(latencies, 50),
+            'latencyP95Ms': percentile(latencies, 95),
+            'recall': float(numpy.mean(recalls)) if recalls else 0.0,
+            'maxScoreError': max(scoreErrors),
+        }
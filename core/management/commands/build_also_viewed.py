@@ -0,0 +1,28 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookrec.operations import alsoViewedOperations
+
+
+class Command(BaseCommand):
+    help = "👀 Builds the \"readers who viewed this also viewed\" model from book view sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=alsoViewedOperations.NUMBER_OF_NEIGHBOURS,
+            help='Number of co-viewed books to keep per book.'
+        )
+        parser.add_argument('--days', type=int, default=None, help='Only use views from the last N days.')
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        since = timezone.now() - datetime.timedelta(days=kwargs['days']) if kwargs['days'] else None
+        self.stdout.write("🔹 Counting co-viewed books...\n")
+        numberOfBooks = alsoViewedOperations.buildAlsoViewedModel(kwargs['neighbours'], since)
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Found co-viewed books for {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
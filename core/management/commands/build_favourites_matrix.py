@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import collaborativeOperations
+
+
+class Command(BaseCommand):
+    help = "❤️ Snapshots the user x book favourites matrix. Changes made afterwards are applied as deltas."
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Building favourites matrix...\n")
+        numberOfFavourites = collaborativeOperations.buildFavouritesMatrix()
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Stored {numberOfFavourites} favourites in {elapsedTime:.2f} seconds.\n")
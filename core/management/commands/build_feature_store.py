@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import featureStoreOperations
+
+
+class Command(BaseCommand):
+    help = (
+        "🗃️ Snapshots book metadata into the id-indexed feature store shared by the recommenders. Run it on the "
+        "same schedule as the other models so renamed books are picked up."
+    )
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Building book feature store...\n")
+        numberOfBooks = featureStoreOperations.buildBookStore()
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Stored {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
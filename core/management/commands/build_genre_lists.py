@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import genreOperations
+
+
+class Command(BaseCommand):
+    help = "🏷️ Rebuilds the per-genre top rated book lists behind the favourite genres shelf. Run on a schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=genreOperations.GENRE_LIST_SIZE,
+            help='Number of books to keep per genre.'
+        )
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Ranking books by genre...\n")
+        numberOfGenres = genreOperations.buildGenreTopBooks(kwargs['size'])
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Built lists for {numberOfGenres} genres in {elapsedTime:.2f} seconds.\n")
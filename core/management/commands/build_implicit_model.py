@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import factorisationOperations
+
+
+class Command(BaseCommand):
+    help = "🧩 Trains the implicit-feedback factorisation model behind the personalised books row."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--factors',
+            type=int,
+            default=factorisationOperations.NUMBER_OF_FACTORS,
+            help='Number of latent factors per user and book.'
+        )
+        parser.add_argument('--iterations', type=int, default=factorisationOperations.NUMBER_OF_ITERATIONS)
+        parser.add_argument('--regularisation', type=float, default=factorisationOperations.REGULARISATION)
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Training implicit factorisation model...\n")
+        numberOfInteractions = factorisationOperations.buildImplicitModel(
+            kwargs['factors'], kwargs['iterations'], kwargs['regularisation']
+        )
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Trained on {numberOfInteractions} interactions in {elapsedTime:.2f} seconds.\n")
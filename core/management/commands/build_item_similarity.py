@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import collaborativeOperations
+
+
+class Command(BaseCommand):
+    help = "🤝 Builds the item-item collaborative filtering model behind the recommended books shelf."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=collaborativeOperations.NUMBER_OF_ITEM_NEIGHBOURS,
+            help='Number of similar books to keep per book.'
+        )
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Building item similarity model...\n")
+        numberOfBooks = collaborativeOperations.buildItemSimilarityModel(kwargs['neighbours'])
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Modelled {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tqdm import tqdm
+
+from bookrec.operations import (
+    alsoViewedOperations,
+    bookOperations,
+    collaborativeOperations,
+    factorisationOperations,
+    featureStoreOperations,
+    genreOperations,
+    similarityOperations
+)
+from core.management import recommendationWorkers
+from core.models import (
+    Book,
+    BookScore,
+    GenreTopBook,
+    Recommendation
+)
+
+RECOMMENDATION_LIMITS = {
+    Recommendation.Recommender.BOOKS_BASED_ON_RATINGS: 20,
+    Recommendation.Recommender.BOOKS_BASED_ON_RATING: 20,
+    Recommendation.Recommender.OTHER_USERS_FAVOURITE_BOOKS: 20,
+    Recommendation.Recommender.SIMILAR_BOOKS: 12,
+    Recommendation.Recommender.BOOKS_BASED_ON_FAVOURITE_GENRES: 100,
+    Recommendation.Recommender.PERSONALISED_BOOKS: 20,
+}
+
+
+def chunks(items, chunkSize):
+    return [items[start:start + chunkSize] for start in range(0, len(items), chunkSize)]
+
+
+class Command(BaseCommand):
+    help = "🧮 Precomputes top-N recommendations for every user and book across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes.')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Users or books per task.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert.')
+        parser.add_argument(
+            '--rebuild-models',
+            action='store_true',
+            help='Rebuild the score table, similarity index and collaborative models first.'
+        )
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.buildModels(kwargs['rebuild_models'])
+
+        userIds = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        bookIds = list(Book.objects.order_by('id').values_list('id', flat=True))
+        tasks = [(recommendationWorkers.recommendForUsers, chunk) for chunk in chunks(userIds, kwargs['chunk_size'])]
+        tasks += [(recommendationWorkers.recommendForBooks, chunk) for chunk in chunks(bookIds, kwargs['chunk_size'])]
+        self.stdout.write(
+            f"📄 Computing recommendations for {len(userIds)} users and {len(bookIds)} books "
+            f"with {kwargs['workers']} workers...\n"
+        )
+
+        numberOfRows = 0
+        with transaction.atomic():
+            Recommendation.objects.all().delete()
+            popularBookIds = bookOperations.popularBookIds(
+                RECOMMENDATION_LIMITS[Recommendation.Recommender.BOOKS_BASED_ON_RATINGS]
+            )
+            numberOfRows += self.writeRows(
+                [
+                    (Recommendation.Recommender.BOOKS_BASED_ON_RATINGS, None, None, bookId, rank)
+                    for rank, bookId in enumerate(popularBookIds)
+                ],
+                kwargs['batch_size']
+            )
+
+            # Workers are spawned rather than forked so they never inherit the parent's open database connection.
+            with ProcessPoolExecutor(
+                max_workers=kwargs['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=recommendationWorkers.initialiseWorker,
+                initargs=(recommendationWorkers.workerSettings(),)
+            ) as pool:
+                futures = [pool.submit(function, chunk, RECOMMENDATION_LIMITS) for function, chunk in tasks]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Tasks completed", unit="task"):
+                    numberOfRows += self.writeRows(future.result(), kwargs['batch_size'])
+
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"\n✅ Stored {numberOfRows} recommendations in {elapsedTime:.2f} seconds.")
+
+    def buildModels(self, rebuild):
+        if rebuild or featureStoreOperations.loadBookStore() is None:
+            self.stdout.write("🔹 Building book feature store...")
+            featureStoreOperations.buildBookStore()
+        if rebuild or not BookScore.objects.exists():
+            self.stdout.write("🔹 Scoring books...")
+            bookOperations.refreshBookScores()
+        if rebuild or not GenreTopBook.objects.exists():
+            self.stdout.write("🔹 Building genre lists...")
+            genreOperations.buildGenreTopBooks()
+        if rebuild or similarityOperations.loadSimilarityIndex() is None:
+            self.stdout.write("🔹 Building similarity index...")
+            similarityOperations.buildSimilarityIndex()
+        if rebuild or collaborativeOperations.loadItemSimilarityModel() is None:
+            self.stdout.write("🔹 Building item similarity model...")
+            collaborativeOperations.buildItemSimilarityModel()
+        if rebuild or collaborativeOperations.loadFavouritesMatrix() is None:
+            self.stdout.write("🔹 Building favourites matrix...")
+            collaborativeOperations.buildFavouritesMatrix()
+        if rebuild or factorisationOperations.loadImplicitModel() is None:
+            self.stdout.write("🔹 Training implicit factorisation model...")
+            factorisationOperations.buildImplicitModel()
+        if rebuild or alsoViewedOperations.loadAlsoViewedModel() is None:
+            self.stdout.write("🔹 Counting co-viewed books...")
+            alsoViewedOperations.buildAlsoViewedModel()
+
+    def writeRows(self, rows, batchSize):
+        Recommendation.objects.bulk_create(
+            [
+                Recommendation(recommender=recommender, user_id=userId, sourceBook_id=sourceBookId, book_id=bookId,
+                               rank=rank)
+                for recommender, userId, sourceBookId, bookId, rank in rows
+            ],
+            batch_size=batchSize
+        )
+        return len(rows)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import (
+    annOperations,
+    similarityOperations
+)
+
+
+class Command(BaseCommand):
+    help = "📚 Builds the content-based similarity index used by the book detail page. Run it on a schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=similarityOperations.NUMBER_OF_NEIGHBOURS,
+            help='Number of similar books to keep per book.'
+        )
+        parser.add_argument(
+            '--approximate',
+            action='store_true',
+            help='Find neighbours with the LSH index instead of the exact scan, for very large catalogues. '
+                 'The LSH index is saved as well.'
+        )
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Building similarity index...\n")
+        if kwargs['approximate']:
+            numberOfBooks = annOperations.buildApproximateSimilarityIndex(kwargs['neighbours'])
+        else:
+            numberOfBooks = similarityOperations.buildSimilarityIndex(kwargs['neighbours'])
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Indexed {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
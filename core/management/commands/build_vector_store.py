@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import vectorStoreOperations
+
+
+class Command(BaseCommand):
+    help = "🗜️ Embeds every book's text features into the compact memory-mapped vector store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dtype',
+            type=str,
+            choices=vectorStoreOperations.DTYPES,
+            default=vectorStoreOperations.DEFAULT_DTYPE,
+            help='Storage type of the vectors.'
+        )
+        parser.add_argument('--dimensions', type=int, default=vectorStoreOperations.DEFAULT_DIMENSIONS)
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write(f"🔹 Embedding books as {kwargs['dtype']} vectors...\n")
+        numberOfBooks = vectorStoreOperations.buildVectorStore(kwargs['dtype'], kwargs['dimensions'])
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Stored {numberOfBooks} book vectors in {elapsedTime:.2f} seconds.\n")
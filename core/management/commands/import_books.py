@@ -0,0 +1,188 @@
+import csv
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (
+    DatabaseError,
+    transaction
+)
+from django.db.models.functions import Lower
+from tqdm import tqdm
+
+from bookrec.operations import (
+    bookOperations,
+    genreOperations
+)
+from core.models import (
+    Book,
+    Category
+)
+
+FORMATS = ('jsonl', 'csv')
+LIST_SEPARATOR = ';'
+
+
+def openDump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def formatOf(path):
+    extension = path.removesuffix('.gz').rsplit('.', 1)[-1].lower()
+    return 'jsonl' if extension in ('jsonl', 'json', 'ndjson') else extension
+
+
+def splitList(value):
+    return [item.strip() for item in (value or '').split(LIST_SEPARATOR) if item.strip()]
+
+
+def volumeFromRow(row):
+    """
+    Reshapes a flat CSV row into a Google Books volume record. Authors and categories are LIST_SEPARATOR
+    separated; the thumbnail becomes the volume's only image link.
+    """
+    volumeInfo = {
+        'title': row.get('title'),
+        'authors': splitList(row.get('authors')) or None,
+        'publisher': row.get('publisher') or None,
+        'publishedDate': row.get('publishedDate') or None,
+        'description': row.get('description') or None,
+        'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': row.get('isbn13')}],
+        'categories': splitList(row.get('categories')),
+        'imageLinks': {'thumbnail': row['thumbnail']} if row.get('thumbnail') else None,
+        'averageRating': float(row['averageRating']) if row.get('averageRating') else None,
+        'ratingsCount': int(row['ratingsCount']) if row.get('ratingsCount') else None,
+    }
+    return {'selfLink': row.get('selfLink') or '', 'volumeInfo': volumeInfo}
+
+
+def readVolumes(file, dumpFormat):
+    """
+    Yields one volume record per line or row, or None for one that cannot be parsed.
+    """
+    if dumpFormat == 'csv':
+        for row in csv.DictReader(file):
+            try:
+                yield volumeFromRow(row)
+            except ValueError:
+                yield None
+        return
+
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+class Command(BaseCommand):
+    help = "📥 Streams a JSONL or CSV dump of Google Books volumes into the catalogue in large batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='JSONL or CSV file of volume records, optionally gzipped.')
+        parser.add_argument('--format', type=str, choices=FORMATS, default=None,
+                            help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **kwargs):
+        path = kwargs['path']
+        dumpFormat = kwargs['format'] or formatOf(path)
+        if dumpFormat not in FORMATS:
+            raise CommandError(f'Cannot tell the format of {path}, pass --format {" or --format ".join(FORMATS)}.')
+
+        startTime = time.time()
+        self.stdout.write(f"🔹 Importing books from {path}...\n")
+        self.read = self.skipped = self.created = self.failed = 0
+
+        batch = {}
+        with openDump(path) as file:
+            for volume in tqdm(readVolumes(file, dumpFormat), desc="Records read", unit="record"):
+                self.read += 1
+                apiBook = self.toApiBook(volume)
+                if apiBook is None:
+                    self.skipped += 1
+                    continue
+
+                # The first record of an isbn13 wins; later duplicates in the batch are dropped here and ones
+                # already in the database are skipped by loadBatch.
+                batch.setdefault(apiBook.isbn13, apiBook)
+                if len(batch) >= kwargs['batch_size']:
+                    self.loadBatch(batch)
+                    batch = {}
+
+        if batch:
+            self.loadBatch(batch)
+
+        elapsedTime = time.time() - startTime
+        duplicates = self.read - self.skipped - self.created - self.failed
+        self.stdout.write(
+            f"✅ Read {self.read} records and created {self.created} books ({self.skipped} invalid, "
+            f"{duplicates} duplicates, {self.failed} rejected by the database) in {elapsedTime:.2f} seconds "
+            f"({self.read / max(elapsedTime, 1e-9):.0f} records per second).\n"
+        )
+        self.stdout.write(
+            "🔹 Run append_text_features, or build_similarity_index for large imports, to give them text features.\n"
+        )
+
+    def toApiBook(self, volume):
+        if not isinstance(volume, dict) or not isinstance(volume.get('volumeInfo'), dict):
+            return None
+
+        isbn13 = bookOperations.getIsbn13(volume)
+        if not isbn13 or len(isbn13) != 13 or not volume['volumeInfo'].get('title'):
+            return None
+
+        # handleMissingDate raises on dates it cannot parse; such records are counted as invalid.
+        try:
+            return bookOperations.apiBookFromVolume(volume, isbn13, volume)
+        except Exception:
+            return None
+
+    def loadBatch(self, batch):
+        """
+        Inserts the books of one batch that are not in the database yet, then gives them their genre list
+        entries. If the batch is rejected, for example by a value too long for its column, its books are
+        retried one by one and only the rejected ones are dropped. Everything is per batch, so memory stays
+        flat however long the dump is.
+        """
+        existingIsbn13s = set(Book.objects.filter(isbn13__in=list(batch)).values_list('isbn13', flat=True))
+        books = [apiBook.toBook() for isbn13, apiBook in batch.items() if isbn13 not in existingIsbn13s]
+        if not books:
+            return
+
+        try:
+            newBookIds = self.insertBooks(books)
+        except DatabaseError:
+            newBookIds = []
+            for book in books:
+                try:
+                    newBookIds.extend(self.insertBooks([book]))
+                except DatabaseError:
+                    self.failed += 1
+
+        genreOperations.addBooks(newBookIds)
+        self.created += len(newBookIds)
+
+    def insertBooks(self, books):
+        """
+        Inserts books with their search vectors and categories in one transaction. Returns their ids.
+        """
+        with transaction.atomic():
+            newBookIds = [book.id for book in Book.objects.bulk_create(books, batch_size=1000)]
+            Book.refreshSearchVectors(Book.objects.filter(id__in=newBookIds))
+
+            categories = {category for book in books for category in book.categories or []}
+            existingCategories = set(
+                Category.objects.annotate(lowerName=Lower('name')).filter(
+                    lowerName__in=[category.casefold() for category in categories]
+                ).values_list('lowerName', flat=True)
+            )
+            Category.objects.bulk_create(
+                [Category(name=category) for category in categories if category.casefold() not in existingCategories],
+                ignore_conflicts=True
+            )
+        return newBookIds
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tqdm import tqdm
+
+from bookrec.operations import (
+    tasteOperations,
+    textFeatureOperations
+)
+from core.models import (
+    Book,
+    TasteVector,
+    UserActivityLog
+)
+
+
+class Command(BaseCommand):
+    help = "🧭 Rebuilds every user's taste vector by replaying their activity logs in order."
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        features = textFeatureOperations.getTextFeatures()
+        if features is None:
+            self.stdout.write("⚠️ No books to build taste vectors from.\n")
+            return
+
+        untilLogId = tasteOperations.lastLogId()
+        bookIdsByIsbn13 = dict(Book.objects.values_list('isbn13', 'id').iterator(chunk_size=5000))
+        logs = UserActivityLog.objects.filter(
+            id__lte=untilLogId,
+            action__in=list(tasteOperations.ACTION_WEIGHTS) + list(tasteOperations.RATING_ACTIONS)
+        ).order_by('user_id', 'id').values_list('id', 'user_id', 'action', 'data', 'timeStamp')
+        self.stdout.write("📄 Replaying activity logs...\n")
+
+        # Every replayed log id is recorded as applied, so update_taste_vectors carries on from here.
+        tastes = {}
+        for logId, userId, action, data, timeStamp in tqdm(
+            logs.iterator(chunk_size=5000), desc="Events", unit="event"
+        ):
+            indices, weights, updatedAt, _ = tastes.get(userId, ([], [], timeStamp, 0))
+            weight = tasteOperations.eventWeight(action, data)
+            bookId = bookIdsByIsbn13.get((data or {}).get('book-isbn13'))
+            if weight > 0 and bookId is not None:
+                indices, weights = tasteOperations.updatedTaste(
+                    indices, weights, updatedAt, tasteOperations.bookVector(features, bookId), weight, timeStamp
+                )
+                updatedAt = max(updatedAt, timeStamp)
+            tastes[userId] = (indices, weights, updatedAt, logId)
+
+        with transaction.atomic():
+            TasteVector.objects.all().delete()
+            TasteVector.objects.bulk_create(
+                [
+                    TasteVector(
+                        user_id=userId, indices=indices, weights=weights, updatedDateTime=updatedAt, lastLogId=logId
+                    )
+                    for userId, (indices, weights, updatedAt, logId) in tastes.items()
+                ],
+                batch_size=1000
+            )
+        tasteOperations.markLogsApplied(untilLogId)
+
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Built {len(tastes)} taste vectors in {elapsedTime:.2f} seconds.\n")
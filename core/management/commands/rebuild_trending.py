@@ -0,0 +1,35 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tqdm import tqdm
+
+from bookrec.operations import trendingOperations
+from core.models import UserActivityLog
+
+
+class Command(BaseCommand):
+    help = "🔥 Rebuilds the trending books counters by replaying recent activity logs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='How many days of activity to replay.')
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        since = timezone.now() - datetime.timedelta(days=kwargs['days'])
+        trendingOperations.reset(since.timestamp())
+
+        logs = UserActivityLog.objects.filter(
+            timeStamp__gte=since, action__in=list(trendingOperations.ACTION_WEIGHTS)
+        ).values_list('action', 'data', 'timeStamp')
+        self.stdout.write(f"📄 Replaying activity since {since:%Y-%m-%d %H:%M}...\n")
+
+        numberOfEvents = 0
+        for action, data, timeStamp in tqdm(logs.iterator(chunk_size=5000), desc="Events replayed", unit="event"):
+            trendingOperations.recordEvent(action, data, timeStamp.timestamp())
+            numberOfEvents += 1
+        trendingOperations.flush()
+
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Replayed {numberOfEvents} events in {elapsedTime:.2f} seconds.\n")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import (
+    bookOperations,
+    cacheOperations
+)
+
+
+class Command(BaseCommand):
+    help = "⏳ Reports how often each recommender missed its time budget and served a fallback."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting them.')
+
+    def handle(self, *args, **kwargs):
+        for name in bookOperations.BUDGETED_RECOMMENDERS:
+            metrics = cacheOperations.budgetMetrics(name)
+            missRate = metrics['misses'] / metrics['calls'] * 100 if metrics['calls'] else 0.0
+            self.stdout.write(
+                f"🔹 {name}: {metrics['misses']} of {metrics['calls']} computations over budget ({missRate:.1f}%)"
+            )
+            if kwargs['reset']:
+                cacheOperations.resetBudgetMetrics(name)
+        self.stdout.write("✅ Done.\n")
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import bookOperations
+
+
+class Command(BaseCommand):
+    help = "⭐ Recomputes the weighted-rating score table behind the popular books row. Run it on a schedule."
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Scoring books...\n")
+        numberOfBooks = bookOperations.refreshBookScores()
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Scored {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
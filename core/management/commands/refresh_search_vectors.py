@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Book
+
+
+class Command(BaseCommand):
+    help = "🔎 Recomputes the stored search vector and authors text of every book, e.g. after adding a column."
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("🔹 Refreshing search vectors...\n")
+        numberOfBooks = Book.refreshSearchVectors()
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Refreshed {numberOfBooks} books in {elapsedTime:.2f} seconds.\n")
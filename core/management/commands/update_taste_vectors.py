@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookrec.operations import tasteOperations
+
+
+class Command(BaseCommand):
+    help = "🧭 Folds activity logged since the last run into users' taste vectors. Run it every few minutes."
+
+    def handle(self, *args, **kwargs):
+        startTime = time.time()
+        self.stdout.write("📄 Applying new activity logs...\n")
+        applied = tasteOperations.applyLoggedEvents()
+
+        elapsedTime = time.time() - startTime
+        self.stdout.write(f"✅ Applied {applied} events to taste vectors in {elapsedTime:.2f} seconds.\n")
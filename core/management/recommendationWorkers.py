@@ -0,0 +1,62 @@
+"""
+Process pool entry points for `manage.py build_recommendations`.
+
+Spawned workers import this module to unpickle the functions they run before Django is set up, so it must not
+import models at module level: they are imported inside each function, after initialiseWorker has run.
+"""
+import os
+
+import django
+from django.conf import settings
+
+# Settings a worker takes from the parent rather than from the environment, so a worker started by the test
+# runner reads the test database and the test model directory.
+WORKER_SETTINGS = ('DATABASES', 'CACHES', 'RECOMMENDATION_MODELS_DIR')
+
+
+def workerSettings():
+    return {name: getattr(settings, name) for name in WORKER_SETTINGS}
+
+
+def initialiseWorker(parentSettings):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookrec.settings')
+    for name, value in parentSettings.items():
+        setattr(settings, name, value)
+    django.setup()
+
+
+def recommendForUsers(userIds, limits):
+    from bookrec.operations import bookOperations
+    from core.models import Recommendation
+
+    rows = []
+    batchRecommendations = bookOperations.batchRecommendationIds(userIds, max(limits.values()))
+    for userId in userIds:
+        recommendations = batchRecommendations[userId]
+        recommendations[Recommendation.Recommender.BOOKS_BASED_ON_FAVOURITE_GENRES] = (
+            bookOperations.favouriteGenreBookIds(
+                userId, limits[Recommendation.Recommender.BOOKS_BASED_ON_FAVOURITE_GENRES]
+            )
+        )
+        for recommender, bookIds in recommendations.items():
+            rows.extend(
+                (recommender, userId, None, bookId, rank)
+                for rank, bookId in enumerate(bookIds[:limits[recommender]])
+            )
+    return rows
+
+
+def recommendForBooks(bookIds, limits):
+    from bookrec.operations import similarityOperations
+    from core.models import Recommendation
+
+    rows = []
+    for sourceBookId in bookIds:
+        # Only the index is used here: the on-the-fly fallback would refit the model for every book.
+        similarBookIds = similarityOperations.similarBookIds(sourceBookId) or []
+        similarBookIds = similarBookIds[:limits[Recommendation.Recommender.SIMILAR_BOOKS]]
+        rows.extend(
+            (Recommendation.Recommender.SIMILAR_BOOKS, None, sourceBookId, bookId, rank)
+            for rank, bookId in enumerate(similarBookIds)
+        )
+    return rows
@@ -2,7 +2,10 @@ from decimal import Decimal
 
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Func, Value
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -14,7 +17,14 @@ class Profile(models.Model):
     profilePicture = models.ImageField(upload_to='profile-picture', blank=True, null=True)
 
 
+def joinedArray(field):
+    return Func(field, Value(' '), function='array_to_string', output_field=models.TextField())
+
+
 class Book(models.Model):
+    SEARCH_CONFIG = 'english'
+    SEARCH_FIELDS = ('title', 'authors', 'categories', 'description')
+
     title = models.CharField(max_length=1024)
     authors = ArrayField(models.CharField(max_length=1024), blank=True)
     publisher = models.CharField(max_length=1024, blank=True, null=True)
@@ -30,13 +40,45 @@ class Book(models.Model):
     haveRead = models.ManyToManyField(User, related_name='haveRead')
     averageRating = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     ratingsCount = models.PositiveIntegerField(default=0, blank=True, null=True)
+    searchVector = SearchVectorField(blank=True, null=True, editable=False)
+    # The authors joined into one string, stored because array_to_string is not IMMUTABLE and so cannot back an
+    # expression index. Kept current with the search vector.
+    authorsText = models.TextField(blank=True, default='', editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=['isbn13'], name='idx-isbn13'),
             models.Index(fields=['title'], name='idx-title'),
+            GinIndex(fields=['searchVector'], name='idx-search-vector'),
+            GinIndex(fields=['title'], name='idx-title-trigram', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['authorsText'], name='idx-authors-trigram', opclasses=['gin_trgm_ops']),
         ]
 
+    @classmethod
+    def searchVectorExpression(cls):
+        # Weighted so a match in the title outranks one in the authors, then categories, then description.
+        return (
+            SearchVector('title', weight='A', config=cls.SEARCH_CONFIG)
+            + SearchVector(joinedArray('authors'), weight='B', config=cls.SEARCH_CONFIG)
+            + SearchVector(joinedArray('categories'), weight='C', config=cls.SEARCH_CONFIG)
+            + SearchVector('description', weight='D', config=cls.SEARCH_CONFIG)
+        )
+
+    @classmethod
+    def refreshSearchVectors(cls, queryset=None):
+        """
+        Recomputes the stored search vector and authors text of the given books in one UPDATE. bulk_create
+        skips save(), so call it after bulk inserts. Returns the number of books updated.
+        """
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(searchVector=cls.searchVectorExpression(), authorsText=joinedArray('authors'))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        updateFields = kwargs.get('update_fields')
+        if updateFields is None or set(updateFields).intersection(self.SEARCH_FIELDS):
+            Book.refreshSearchVectors(Book.objects.filter(pk=self.pk))
+
     def getUrl(self):
         return reverse('core:book-detail-view', kwargs={'isbn13': self.isbn13})
 
@@ -56,6 +98,69 @@ class Book(models.Model):
         return self.isbn13
 
 
+class BookScore(models.Model):
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='score')
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='idx-score'),
+        ]
+
+    def __str__(self):
+        return f'{self.book_id}: {self.score}'
+
+
+class GenreTopBook(models.Model):
+    genre = models.CharField(max_length=2048)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    averageRating = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['genre', '-averageRating', 'book'], name='idx-genre-rating-book'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['genre', 'book'], name='unique-genre-book')
+        ]
+
+    def __str__(self):
+        return f'{self.genre}: {self.book_id}'
+
+
+class Recommendation(models.Model):
+    class Recommender(models.TextChoices):
+        BOOKS_BASED_ON_RATINGS = 'BOOKS_BASED_ON_RATINGS', _('Books based on ratings')
+        BOOKS_BASED_ON_RATING = 'BOOKS_BASED_ON_RATING', _('Books based on rating')
+        OTHER_USERS_FAVOURITE_BOOKS = 'OTHER_USERS_FAVOURITE_BOOKS', _('Other users favourite books')
+        SIMILAR_BOOKS = 'SIMILAR_BOOKS', _('Similar books')
+        BOOKS_BASED_ON_FAVOURITE_GENRES = 'BOOKS_BASED_ON_FAVOURITE_GENRES', _('Books based on favourite genres')
+        PERSONALISED_BOOKS = 'PERSONALISED_BOOKS', _('Personalised books')
+
+    recommender = models.CharField(max_length=64, choices=Recommender.choices)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    sourceBook = models.ForeignKey(Book, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recommender', 'user', 'rank'], name='idx-recommender-user-rank'),
+            models.Index(fields=['recommender', 'sourceBook', 'rank'], name='idx-recommender-book-rank'),
+        ]
+
+
+class TasteVector(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='tasteVector')
+    indices = ArrayField(models.IntegerField(), default=list, blank=True)
+    weights = ArrayField(models.FloatField(), default=list, blank=True)
+    updatedDateTime = models.DateTimeField(default=timezone.now)
+    lastLogId = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {len(self.indices)} terms'
+
+
 class BookReview(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='bookReviews')
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -72,6 +177,7 @@ class BookReview(models.Model):
             models.Index(fields=['book'], name='idx-book'),
             models.Index(fields=['creator'], name='idx-creator'),
             models.Index(fields=['book', 'creator'], name='idx-book-creator'),
+            GinIndex(fields=['comment'], name='idx-comment-trigram', opclasses=['gin_trgm_ops']),
         ]
         constraints = [
             models.UniqueConstraint(fields=['book', 'creator'], name='unique-book-creator')
@@ -58,6 +58,9 @@ class BookSerializerV2(serializers.ModelSerializer):
         ]
 
     def get_favouriteReadCount(self, book):
+        # Querysets annotated with Count('favouriteRead') as favouriteReadCount avoid the COUNT query per book.
+        if hasattr(book, 'favouriteReadCount'):
+            return book.favouriteReadCount
         return book.favouriteRead.count()
 
     def get_averageRating(self, book):
@@ -0,0 +1,68 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from core.models import (
+    Book,
+    BookReview,
+    Recommendation
+)
+
+DESCRIPTIONS = [
+    'A space opera about a desert planet, spice and a ruling family.',
+    'A space opera about a galactic empire, robots and a desert planet.',
+    'A space opera about a ruling family fighting for a galactic empire.',
+    'A murder mystery in a country house with a detective and a butler.',
+    'A murder mystery on a train with a detective and a missing butler.',
+    'A murder mystery in a country house on a train line.',
+]
+
+
+class BuildRecommendationsTest(TransactionTestCase):
+    """
+    Runs the command end to end, spawned worker processes included, against the test database.
+    """
+
+    def setUp(self):
+        self.modelsDirectory = tempfile.TemporaryDirectory()
+        self.enterContext(override_settings(RECOMMENDATION_MODELS_DIR=self.modelsDirectory.name))
+        self.addCleanup(self.modelsDirectory.cleanup)
+
+        self.users = [User.objects.create_user(username=f'reader{i}', password='password') for i in range(4)]
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}',
+                authors=['Author A' if i < 3 else 'Author B'],
+                description=description,
+                isbn13=f'978000000000{i}',
+                categories=['Science Fiction' if i < 3 else 'Mystery'],
+                thumbnail='https://dummyimage.com/1997x3101',
+                selfLink=''
+            )
+            for i, description in enumerate(DESCRIPTIONS)
+        ]
+        for user, books in zip(self.users, [[0, 1], [0, 1, 2], [3, 4], [3, 4, 5]]):
+            for bookIndex in books:
+                self.books[bookIndex].favouriteRead.add(user)
+                BookReview.objects.create(book=self.books[bookIndex], creator=user, comment='Great', rating=5)
+
+    def test_stores_recommendations_computed_by_spawned_workers(self):
+        output = StringIO()
+        call_command('build_recommendations', workers=2, chunk_size=2, rebuild_models=True, stdout=output)
+
+        self.assertIn('Stored', output.getvalue())
+        similarBooks = Recommendation.objects.filter(recommender=Recommendation.Recommender.SIMILAR_BOOKS)
+        self.assertEqual(
+            set(similarBooks.values_list('sourceBook_id', flat=True)), {book.id for book in self.books}
+        )
+        self.assertTrue(
+            Recommendation.objects.filter(
+                recommender=Recommendation.Recommender.OTHER_USERS_FAVOURITE_BOOKS, user=self.users[0]
+            ).exists()
+        )
+        self.assertTrue(
+            Recommendation.objects.filter(recommender=Recommendation.Recommender.BOOKS_BASED_ON_RATINGS).exists()
+        )
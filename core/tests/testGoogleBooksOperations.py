@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.test import SimpleTestCase, override_settings
+
+from bookrec.operations import googleBooksOperations
+
+DETAIL_DELAY = 0.3
+SLOW_DELAY = 1.0
+
+
+class GoogleBooksStub(BaseHTTPRequestHandler):
+    """
+    Answers /volumes searches and /volumes/<id> detail lookups the way the Google Books API does. Searches for
+    'nothing' have no results and searches for 'broken' fail; volume 'slow' answers after SLOW_DELAY seconds
+    and volume 'missing' is a 404.
+    """
+
+    requests = []
+    inFlight = 0
+    maxInFlight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            GoogleBooksStub.requests.append(self.path)
+            GoogleBooksStub.inFlight += 1
+            GoogleBooksStub.maxInFlight = max(GoogleBooksStub.maxInFlight, GoogleBooksStub.inFlight)
+        try:
+            if url.path == '/volumes':
+                self.search(parse_qs(url.query)['q'][0])
+            else:
+                self.volume(url.path.rsplit('/', 1)[-1])
+        finally:
+            with self.lock:
+                GoogleBooksStub.inFlight -= 1
+
+    def search(self, query):
+        if query == 'broken':
+            self.respond(500, {'error': 'backend error'})
+        elif query == 'nothing':
+            self.respond(200, {'kind': 'books#volumes', 'totalItems': 0})
+        else:
+            self.respond(200, {'totalItems': 1, 'items': [{'selfLink': self.link('dune'), 'volumeInfo': {}}]})
+
+    def volume(self, volumeId):
+        if volumeId == 'missing':
+            self.respond(404, {'error': 'not found'})
+            return
+        time.sleep(SLOW_DELAY if volumeId == 'slow' else DETAIL_DELAY)
+        self.respond(200, {'id': volumeId, 'volumeInfo': {'title': volumeId}})
+
+    def respond(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def link(self, volumeId):
+        return f'http://{self.server.server_address[0]}:{self.server.server_address[1]}/volumes/{volumeId}'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GoogleBooksOperationsTest(SimpleTestCase):
+    """
+    Runs the Google Books client against a local stub of the API.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), GoogleBooksStub)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.apiUrl = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        cls.enterClassContext(override_settings(GOOGLE_BOOKS_API_URL=cls.apiUrl))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        googleBooksOperations._responseCache.clear()
+        GoogleBooksStub.requests = []
+        GoogleBooksStub.maxInFlight = 0
+
+    def volumeLink(self, volumeId):
+        return f'{self.apiUrl}/volumes/{volumeId}'
+
+    def test_fetches_volume_details_concurrently(self):
+        selfLinks = [self.volumeLink(f'volume{i}') for i in range(googleBooksOperations.DETAIL_WORKERS)]
+
+        startTime = time.perf_counter()
+        details = googleBooksOperations.fetchVolumeDetails(selfLinks + selfLinks[:2])
+        elapsedTime = time.perf_counter() - startTime
+
+        self.assertEqual(
+            {selfLink: volume['volumeInfo']['title'] for selfLink, volume in details.items()},
+            {selfLink: f'volume{i}' for i, selfLink in enumerate(selfLinks)}
+        )
+        self.assertEqual(len(GoogleBooksStub.requests), len(selfLinks))
+        self.assertGreater(GoogleBooksStub.maxInFlight, 1)
+        self.assertLess(elapsedTime, DETAIL_DELAY * len(selfLinks) / 2)
+
+    def test_details_that_miss_the_timeout_fall_back_to_an_empty_volume(self):
+        fastLink, slowLink = self.volumeLink('fast'), self.volumeLink('slow')
+
+        with mock.patch.object(googleBooksOperations, 'DETAILS_TIMEOUT', (DETAIL_DELAY + SLOW_DELAY) / 2):
+            details = googleBooksOperations.fetchVolumeDetails([fastLink, slowLink])
+
+        self.assertEqual(details[fastLink]['volumeInfo']['title'], 'fast')
+        self.assertEqual(details[slowLink], googleBooksOperations.emptyVolume())
+
+    def test_searches_without_results_are_cached_for_the_negative_ttl(self):
+        with override_settings(GOOGLE_BOOKS_CACHE_TTL=60, GOOGLE_BOOKS_NEGATIVE_CACHE_TTL=60):
+            self.assertEqual(googleBooksOperations.searchVolumes('nothing'), [])
+            self.assertEqual(googleBooksOperations.searchVolumes('  NOTHING '), [])
+        self.assertEqual(len(GoogleBooksStub.requests), 1)
+
+        googleBooksOperations._responseCache.clear()
+        with override_settings(GOOGLE_BOOKS_CACHE_TTL=60, GOOGLE_BOOKS_NEGATIVE_CACHE_TTL=0):
+            googleBooksOperations.searchVolumes('nothing')
+            googleBooksOperations.searchVolumes('nothing')
+            googleBooksOperations.searchVolumes('dune')
+            googleBooksOperations.searchVolumes('dune')
+        self.assertEqual(
+            [parse_qs(urlparse(path).query)['q'][0] for path in GoogleBooksStub.requests[1:]],
+            ['nothing', 'nothing', 'dune']
+        )
+
+    def test_failures_are_not_cached(self):
+        missingLink = self.volumeLink('missing')
+
+        for _ in range(2):
+            self.assertEqual(googleBooksOperations.searchVolumes('broken'), [])
+            self.assertEqual(
+                googleBooksOperations.fetchVolumeDetails([missingLink])[missingLink],
+                googleBooksOperations.emptyVolume()
+            )
+        self.assertEqual(len(GoogleBooksStub.requests), 4)
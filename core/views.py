@@ -219,15 +219,28 @@ def indexView(request):
     context = {
         'categories': Category.objects.all(),
         'recentlyAddedBooks': bookOperations.recentlyAddedBooks(),
+        'trendingBooks': bookOperations.trendingBooks(),
         'booksBasedOnRatings': bookOperations.booksBasedOnRatings(),
         'booksBasedOnViewings': bookOperations.booksBasedOnViewings(request),
         'otherUsersFavouriteBooks': bookOperations.otherUsersFavouriteBooks(request),
+        'personalisedBooks': bookOperations.personalisedBooks(request),
     }
     return render(request, 'core/index.html', context)
 
 
 def bookListView(request):
-    books = bookOperations.googleBooksAPIRequests(request.GET.get('query'))
+    query = request.GET.get('query')
+    books = bookOperations.googleBooksAPIRequests(query) if query else Book.objects.none()
+    paginator = Paginator(books, 20)
+    page = request.GET.get('page')
+
+    try:
+        books = paginator.page(page)
+    except PageNotAnInteger:
+        books = paginator.page(1)
+    except EmptyPage:
+        books = paginator.page(paginator.num_pages)
+
     context = {
         'books': books
     }
@@ -252,6 +265,7 @@ def bookDetailView(request, isbn13):
     context = {
         'book': book,
         'similarBooks': bookOperations.similarBooks(book),
+        'alsoViewedBooks': bookOperations.alsoViewedBooks(book),
     }
     logOperations.log(request, UserActivityLog.Action.VIEW_BOOK, data={'book-isbn13': isbn13, 'book-title': book.title})
     return render(request, 'core/bookDetailView.html', context)
@@ -292,7 +306,9 @@ def userShelfView(request):
         raise Exception('Invalid tab')
 
     query = request.GET.get('query')
-    if query:
+    if query and request.GET.get('fuzzy'):
+        records = bookOperations.fuzzyShelfSearch(records, query)
+    elif query:
         searchFields = {
             Book: ['title', 'isbn13', 'categories'],
             BookReview: ['comment', 'book__title', 'book__isbn13', 'book__categories']
@@ -300,7 +316,8 @@ def userShelfView(request):
         q = Q()
         for field in searchFields:
             q |= Q(**{f'{field}__icontains': query})
-        records = records.filter(q).distinct()
+        # None of the fields are multi-valued relations, so the OR cannot duplicate rows and needs no DISTINCT.
+        records = records.filter(q)
 
     paginator = Paginator(records, 20)
 